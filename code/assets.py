@@ -0,0 +1,106 @@
+import sys
+from collections import OrderedDict
+from os import path as os_path
+
+import pygame
+
+from atlas import load_image
+from util import import_folder, import_folder_dict
+
+
+# every image, folder of images, sound and font is loaded (and converted to the display format) only once and then
+# shared by everything that asks for the same path
+# the registry keeps track of the memory used by each entry and can drop the entries nobody is using anymore
+class AssetRegistry:
+    def __init__(self, budget=None):
+        # entries are kept in the order they were last used so the least recently used are evicted first
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        # when set, unused entries are evicted every time the registry grows over this amount of bytes
+        self.budget = budget
+
+    def get(self, key, load, measure):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        asset = load()
+        self.entries[key] = asset
+        self.sizes[key] = measure(asset)
+        self.size += self.sizes[key]
+        if self.budget is not None and self.size > self.budget:
+            self.evict_unused(self.budget)
+        return asset
+
+    def image(self, path, alpha=True):
+        path = os_path.normpath(path)
+
+        def load():
+            if alpha:
+                return load_image(path)
+            return pygame.image.load(path).convert()
+
+        return self.get(('image', path, alpha), load, surface_size)
+
+    def folder(self, path):
+        path = os_path.normpath(path)
+        return self.get(('folder', path), lambda: import_folder(path),
+                        lambda surfs: sum(surface_size(surf) for surf in surfs))
+
+    def folder_dict(self, path):
+        path = os_path.normpath(path)
+        return self.get(('folder_dict', path), lambda: import_folder_dict(path),
+                        lambda surfs: sum(surface_size(surf) for surf in surfs.values()))
+
+    # the volume is set when the sound is loaded, every user of the path shares it
+    def sound(self, path, volume=None):
+        path = os_path.normpath(path)
+
+        def load():
+            sound = pygame.mixer.Sound(path)
+            if volume is not None:
+                sound.set_volume(volume)
+            return sound
+
+        return self.get(('sound', path), load, sound_size)
+
+    # images and sounds decoded somewhere else (e.g by the threads of the loader) are added as if they were loaded here
+    def add_image(self, path, surf, alpha=True):
+        self.get(('image', os_path.normpath(path), alpha), lambda: surf, surface_size)
+
+    def add_sound(self, path, sound, volume=None):
+        if volume is not None:
+            sound.set_volume(volume)
+        self.get(('sound', os_path.normpath(path)), lambda: sound, sound_size)
+
+    def font(self, path, size):
+        path = os_path.normpath(path)
+        return self.get(('font', path, size), lambda: pygame.font.Font(path, size), lambda font: 0)
+
+    # drops the least recently used entries that are only referenced by the registry until the used memory fits
+    # in the budget (all of them without a budget), returns the amount of bytes freed
+    def evict_unused(self, budget=None):
+        freed = 0
+        for key in list(self.entries):
+            if budget is not None and self.size <= budget:
+                break
+            # references: the entries dict and the argument of getrefcount
+            if sys.getrefcount(self.entries[key]) <= 2:
+                del self.entries[key]
+                size = self.sizes.pop(key)
+                self.size -= size
+                freed += size
+        return freed
+
+
+def surface_size(surf):
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+def sound_size(sound):
+    frequency, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * channels * abs(size) // 8
+
+
+assets = AssetRegistry()
@@ -0,0 +1,100 @@
+import os
+
+import pygame
+
+from cache import read_header, write_header
+from settings import *
+
+GRAPHICS_PATH = os.path.normpath('../graphics')
+ATLAS_CACHE_PATH = os.path.normpath('../data/graphics.cache')
+
+
+# places rectangles of the given sizes in rows (shelves), tallest first, returns their positions and the sheet size
+def pack(sizes, max_width=2048):
+    width = max([max_width] + [w for w, _ in sizes])
+    rects = [None] * len(sizes)
+    x = y = shelf_height = used_width = 0
+    for index in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[index]
+        if x + w > width:
+            y += shelf_height
+            x = shelf_height = 0
+        rects[index] = pygame.Rect(x, y, w, h)
+        x += w
+        used_width = max(used_width, x)
+        shelf_height = max(shelf_height, h)
+    return rects, (used_width, y + shelf_height)
+
+
+# copies many surfaces in one transparent sheet, returns the sheet and the rect of every surface in it
+def build_sheet(surfaces):
+    rects, size = pack([surf.get_size() for surf in surfaces])
+    sheet = pygame.Surface((max(size[0], 1), max(size[1], 1)), pygame.SRCALPHA)
+    sheet.blits(list(zip(surfaces, rects)), False)
+    return sheet, rects
+
+
+def subsurfaces(sheet, rects):
+    return [sheet.subsurface(rect) for rect in rects]
+
+
+# images of a family folder (with its subfolders) by their path inside the folder
+def family_files(family_path):
+    files = []
+    for folder, _, img_files in os.walk(family_path):
+        for img in img_files:
+            if img.endswith('.png'):
+                files.append(os.path.relpath(os.path.join(folder, img), family_path).replace(os.sep, '/'))
+    return sorted(files)
+
+
+# the sheet of a family is valid as long as none of its images was added, removed or modified
+def family_key(family_path, files):
+    key = []
+    for file in files:
+        stat = os.stat(os.path.join(family_path, file))
+        key.append([file, stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def pack_family(family_path, files, cache):
+    sheet, rects = build_sheet([pygame.image.load(os.path.join(family_path, file)) for file in files])
+    os.makedirs(cache, exist_ok=True)
+    pygame.image.save(sheet, os.path.join(cache, 'sheet.png'))
+    rects = {file: list(rect) for file, rect in zip(files, rects)}
+    write_header(cache, family_key(family_path, files), {'rects': rects})
+    return sheet, rects
+
+
+# the sheet of a family (not converted to the display format, so it can be read by any thread) and the rect of every
+# image in it
+def read_family(family):
+    family_path = os.path.join(GRAPHICS_PATH, family)
+    cache = os.path.join(ATLAS_CACHE_PATH, family)
+    files = family_files(family_path)
+    header = read_header(cache, family_key(family_path, files))
+    if header is not None:
+        return pygame.image.load(os.path.join(cache, 'sheet.png')), header['rects']
+    return pack_family(family_path, files, cache)
+
+
+# sheets are loaded (or packed on the first launch) by the loader or the first time one of their images is needed
+families = {}
+
+
+def add_family(family, sheet, rects):
+    sheet = sheet.convert_alpha()
+    families[family] = {file: sheet.subsurface(rect) for file, rect in rects.items()}
+
+
+# the image as a subsurface of the sheet of its family, images outside of the packed families are loaded by themselves
+def load_image(path):
+    path = os.path.normpath(path)
+    relative = os.path.relpath(path, GRAPHICS_PATH).replace(os.sep, '/')
+    family, _, file = relative.partition('/')
+    if family in ATLAS_FAMILIES:
+        if family not in families:
+            add_family(family, *read_family(family))
+        if file in families[family]:
+            return families[family][file]
+    return pygame.image.load(path).convert_alpha()
@@ -0,0 +1,69 @@
+import pygame
+
+from assets import assets
+from settings import *
+
+
+# the music and every sound effect of the game
+# the music is streamed by pygame.mixer.music instead of being decoded into memory, the effects are loaded once into a
+# bank shared by everything that plays them
+# every category of effects has its own channels, so a burst of one category (e.g hoeing a whole field) can not take
+# the channels of the others, and an effect played again before its minimum interval is skipped
+class Audio:
+    def __init__(self):
+        self.bank = {}
+        # channel indexes of every category and when each channel started its current sound
+        self.pools = {}
+        self.started = {}
+        self.last_played = {}
+        self.ready = False
+
+    # the mixer only exists after pygame.init, so the channels and the bank are set up on the first use with a mixer
+    # (until then every call does nothing and tries again next time)
+    def setup(self):
+        if not pygame.mixer.get_init():
+            return False
+        if self.ready:
+            return True
+
+        # the pools are reserved, so sounds played without the audio system never take their channels
+        channels = sum(SOUND_CHANNELS.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+        pygame.mixer.set_reserved(channels)
+        index = 0
+        for category, count in SOUND_CHANNELS.items():
+            self.pools[category] = list(range(index, index + count))
+            index += count
+        self.started = dict.fromkeys(range(channels), 0)
+
+        for name, (path, volume, category, interval) in SOUNDS.items():
+            self.bank[name] = assets.sound(path, volume)
+        self.ready = True
+        return True
+
+    def play_music(self, path=MUSIC_PATH, volume=MUSIC_VOLUME):
+        if not self.setup():
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops=-1)
+
+    def play(self, name):
+        if not self.setup():
+            return
+        path, volume, category, interval = SOUNDS[name]
+        current_time = pygame.time.get_ticks()
+        if name in self.last_played and current_time - self.last_played[name] < interval:
+            return
+        self.last_played[name] = current_time
+
+        # a free channel of the category, or the one that has been playing the longest (voice stealing)
+        pool = self.pools[category]
+        index = next((index for index in pool if not pygame.mixer.Channel(index).get_busy()), None)
+        if index is None:
+            index = min(pool, key=self.started.get)
+        pygame.mixer.Channel(index).play(self.bank[name])
+        self.started[index] = current_time
+
+
+audio = Audio()
@@ -0,0 +1 @@
+# headless benchmarks of the game loop, run from the code folder with: python -m benchmark --help
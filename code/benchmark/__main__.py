@@ -0,0 +1,32 @@
+import argparse
+import sys
+
+from benchmark.harness import commit, run_scenario, write_results
+from benchmark.scenarios import SCENARIOS
+
+parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                 description='runs Level.run headless with a fixed dt and scripted input')
+parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS),
+                    help=f'scenarios to run, all by default ({", ".join(SCENARIOS)})')
+parser.add_argument('--frames', type=int, default=600, help='frames per scenario')
+parser.add_argument('--dt', type=float, default=1 / 60, help='fixed delta time of every frame')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--rain-minutes', type=float, default=1, help='game minutes of the rain scenario')
+parser.add_argument('--plants', type=int, default=1000, help='plants of the plants stress scenario')
+parser.add_argument('--trees', type=int, default=1000, help='trees of the trees stress scenario')
+parser.add_argument('--drops', type=int, default=5000, help='rain particles of the drops stress scenario')
+parser.add_argument('--output', help='json file for the results (stdout by default)')
+options = parser.parse_args()
+for name in options.scenarios:
+    if name not in SCENARIOS:
+        parser.error(f'unknown scenario {name}')
+
+results = {'commit': commit(), 'results': []}
+for name in options.scenarios:
+    result = run_scenario(name, SCENARIOS[name], options)
+    results['results'].append(result)
+    frame_ms = result['frame_ms']
+    print(f"{name:>8}: p50 {frame_ms['p50']:.2f} ms  p95 {frame_ms['p95']:.2f} ms  p99 {frame_ms['p99']:.2f} ms",
+          file=sys.stderr)
+
+write_results(results, options.output)
@@ -0,0 +1,123 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# the game loads its files relative to the code folder and has to run without a window or a sound card
+CODE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.chdir(CODE_PATH)
+sys.path.insert(0, CODE_PATH)
+
+import pygame
+
+import keyboard
+from settings import *
+
+
+# stands in for the result of pygame.key.get_pressed, scenarios press and release keys between frames
+class ScriptedKeys:
+    def __init__(self):
+        self.pressed = set()
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+    def press(self, *keys):
+        self.pressed.update(keys)
+
+    def release(self, *keys):
+        self.pressed.difference_update(keys)
+
+    def release_all(self):
+        self.pressed.clear()
+
+
+def boot():
+    pygame.init()
+    if not pygame.display.get_surface():
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+def percentile(samples, value):
+    return float(np.percentile(samples, value)) if samples else 0.0
+
+
+# summary of the frame times (ms) of a run
+def frame_stats(samples):
+    return {
+        'mean': float(np.mean(samples)) if samples else 0.0,
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'max': max(samples, default=0.0)}
+
+
+# the results go to the json file given with --output, or to stdout
+def write_results(results, output):
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=CODE_PATH).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def sprite_counts(level):
+    rain = level.rain
+    rain_particles = (rain.floor.age < rain.floor.lifetime).sum() + (rain.drops.age < rain.drops.lifetime).sum()
+    return {
+        'chunks': len(level.world.loaded),
+        'all_sprites': len(level.all_sprites),
+        'tiles': level.all_sprites.render_queue.tile_count,
+        'collision_sprites': len(level.collision_sprites),
+        'trees': len(level.tree_sprites),
+        'soil_tiles': len(level.soil_layer.soil_sprites),
+        'plants': len(level.soil_layer.plant_sprites),
+        'rain_particles': int(rain_particles)}
+
+
+# builds a new level and runs the scenario on it with a fixed dt, timing every frame (level.run + display update)
+def run_scenario(name, setup, options):
+    from level import Level
+
+    boot()
+    random.seed(options.seed)
+    keys = ScriptedKeys()
+    keyboard.set_source(lambda: keys)
+    try:
+        level = Level(options.seed, save_path=None)
+        level.raining = False
+        frames, step = setup(level, keys, options)
+
+        samples = []
+        for frame in range(frames):
+            pygame.event.pump()
+            if step:
+                step(frame)
+            start = time.perf_counter()
+            level.run(options.dt)
+            pygame.display.update()
+            samples.append((time.perf_counter() - start) * 1000)
+        pygame.mixer.stop()
+    finally:
+        keyboard.reset_source()
+
+    return {
+        'scenario': name,
+        'frames': frames,
+        'dt': options.dt,
+        'frame_ms': frame_stats(samples),
+        'sprites': sprite_counts(level)}
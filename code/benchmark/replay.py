@@ -0,0 +1,73 @@
+# replays a recorded session (python main.py --record PATH) as fast as possible: python -m benchmark.replay --help
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pygame
+
+import keyboard
+from benchmark.harness import commit, frame_stats, write_results
+from replay import KeyState, load_recording, mismatches
+
+parser = argparse.ArgumentParser(prog='python -m benchmark.replay',
+                                 description='feeds a recorded session back into the game headless and without '
+                                             'waiting between frames, then checks it ended like the recording')
+parser.add_argument('recording')
+parser.add_argument('--no-render', action='store_true', help='only simulates, nothing is drawn')
+parser.add_argument('--output', help='json file for the results (stdout by default)')
+options = parser.parse_args()
+
+from main import Game
+
+session = load_recording(options.recording)
+# the random generators start like they did in the recorded session
+random.seed(session['seed'])
+# the level loads the save the session started from (no save -> a new farm)
+save_path = None
+if session['start']:
+    save_path = os.path.join(tempfile.mkdtemp(), 'farm.sav')
+    with open(save_path, 'wb') as file:
+        file.write(session['start'])
+
+keys = KeyState()
+keyboard.set_source(lambda: keys)
+try:
+    game = Game(session['seed'], save_path)
+    render = not options.no_render
+    samples = []
+    start_time = time.perf_counter()
+    for frame_time, mask in zip(session['frame_times'].tolist(), session['keys'].tolist()):
+        pygame.event.pump()
+        keys.mask = mask
+        start = time.perf_counter()
+        game.frame(frame_time, render)
+        if render:
+            pygame.display.update()
+        samples.append((time.perf_counter() - start) * 1000)
+    wall_time = time.perf_counter() - start_time
+    if game.level.save_game:
+        game.level.save_game.wait()
+    pygame.mixer.stop()
+finally:
+    keyboard.reset_source()
+
+different = mismatches(session, game.level)
+game_time = float(session['frame_times'].sum())
+results = {
+    'commit': commit(),
+    'recording': options.recording,
+    'frames': len(samples),
+    'render': render,
+    'game_seconds': game_time,
+    'replay_seconds': wall_time,
+    'speedup': game_time / wall_time if wall_time else 0.0,
+    'frame_ms': frame_stats(samples),
+    'match': not different,
+    'mismatches': different}
+write_results(results, options.output)
+if different:
+    print(f'replay ended differently from the recording: {", ".join(different)}', file=sys.stderr)
+    sys.exit(1)
@@ -0,0 +1,56 @@
+# save and load times of a big farm: python -m benchmark.savegame --help
+import argparse
+import os
+import tempfile
+import time
+
+from benchmark.harness import boot, commit, write_results
+from benchmark.scenarios import farm_cells
+
+parser = argparse.ArgumentParser(prog='python -m benchmark.savegame',
+                                 description='times the autosave (snapshot and background write) and the load of '
+                                             'a farm')
+parser.add_argument('--plants', type=int, default=5000, help='planted cells of the farm')
+parser.add_argument('--repeat', type=int, default=5, help='saves and loads to time')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--output', help='json file for the results (stdout by default)')
+options = parser.parse_args()
+
+boot()
+from level import Level
+from save import SaveGame, snapshot
+
+path = os.path.join(tempfile.mkdtemp(), 'farm.sav')
+level = Level(options.seed, save_path=None)
+soil_layer = level.soil_layer
+for index, cell in enumerate(farm_cells(level, options.plants)):
+    soil_layer.get_hit(cell)
+    soil_layer.plant_seed(cell, 'corn' if index % 2 else 'tomato')
+soil_layer.water_all()
+level.reset()
+
+# snapshot: what a save costs the frame, write: compressing and writing (done by the worker thread)
+samples = {'snapshot': [], 'write': [], 'load': []}
+save_game = SaveGame(path)
+for repeat in range(options.repeat):
+    start = time.perf_counter()
+    state = snapshot(level)
+    samples['snapshot'].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    save_game.write(state)
+    samples['write'].append((time.perf_counter() - start) * 1000)
+
+    # loading builds a whole new level, only the time spent in the load is counted
+    new_level = Level(options.seed, save_path=None)
+    start = time.perf_counter()
+    SaveGame(path).load(new_level)
+    samples['load'].append((time.perf_counter() - start) * 1000)
+
+results = {
+    'commit': commit(),
+    # the sprites only exist in the loaded chunks, the crops keep the whole farm
+    'plants': int(soil_layer.crops.active[:soil_layer.crops.count].sum()),
+    'bytes': os.path.getsize(path),
+    'ms': {name: {'min': min(values), 'mean': sum(values) / len(values)} for name, values in samples.items()}}
+write_results(results, options.output)
@@ -0,0 +1,133 @@
+import random
+
+import numpy as np
+import pygame
+
+from settings import *
+
+# name -> setup(level, keys, options) returning the number of frames to run and a step(frame) called before each
+# frame (or None)
+SCENARIOS = {}
+
+
+def scenario(setup):
+    SCENARIOS[setup.__name__] = setup
+    return setup
+
+
+def move_player(level, pos):
+    player = level.player
+    player.pos.update(pos)
+    player.hitbox.center = (round(player.pos.x), round(player.pos.y))
+    player.rect.center = player.hitbox.center
+
+
+# centers of the farmable cells, closest to the middle of the field first
+def farm_cells(level, count=None):
+    from soil import FARMABLE
+
+    grid = level.soil_layer.grid
+    cells = np.argwhere(grid & FARMABLE)
+    center = cells.mean(axis=0)
+    if count is not None:
+        # stress sizes bigger than the field make more of the map farmable around it
+        cells = np.argwhere(np.ones_like(grid))
+    cells = cells[np.argsort(((cells - center) ** 2).sum(axis=1), kind='stable')][:count]
+    if count is not None:
+        grid[tuple(cells.T)] |= FARMABLE
+    return [((col + 0.5) * TILE_SIZE, (row + 0.5) * TILE_SIZE) for row, col in cells.tolist()]
+
+
+@scenario
+def idle(level, keys, options):
+    return options.frames, None
+
+
+@scenario
+def walk(level, keys, options):
+    # walks a loop around the farm, changing direction every leg
+    legs = [(pygame.K_DOWN, 60), (pygame.K_RIGHT, 240), (pygame.K_DOWN, 180), (pygame.K_LEFT, 240),
+            (pygame.K_UP, 120), (pygame.K_RIGHT, 120)]
+    plan = [key for key, frames in legs for _ in range(frames)]
+
+    def step(frame):
+        keys.release_all()
+        keys.press(plan[frame % len(plan)])
+
+    return options.frames, step
+
+
+@scenario
+def till(level, keys, options):
+    # tills one more cell of the field every frame, then keeps running on the tilled field
+    cells = farm_cells(level)
+    move_player(level, cells[0])
+
+    def step(frame):
+        if frame < len(cells):
+            level.soil_layer.get_hit(cells[frame])
+
+    return max(options.frames, len(cells)), step
+
+
+@scenario
+def rain(level, keys, options):
+    level.raining = True
+    return int(options.rain_minutes * 60 / options.dt), None
+
+
+@scenario
+def shop(level, keys, options):
+    level.toggle_shop()
+
+    def step(frame):
+        keys.release_all()
+        if frame % 15 == 0:
+            keys.press(pygame.K_DOWN)
+
+    return options.frames, step
+
+
+@scenario
+def sleep(level, keys, options):
+    level.player.sleep = True
+    return options.frames, None
+
+
+@scenario
+def plants(level, keys, options):
+    soil_layer = level.soil_layer
+    cells = farm_cells(level, options.plants)
+    for cell in cells:
+        soil_layer.get_hit(cell)
+        soil_layer.plant_seed(cell, 'corn')
+    # a couple of watered days so the plants are sorted with the player in the main layer
+    for day in range(2):
+        soil_layer.water_all()
+        level.reset()
+    move_player(level, cells[0])
+    return options.frames, None
+
+
+@scenario
+def trees(level, keys, options):
+    from sprites import Tree
+
+    surf = next(obj.image for obj in level.tmx_data.get_objects('Trees') if obj.name == 'Large')
+    width, height = level.tmx_data.width * TILE_SIZE, level.tmx_data.height * TILE_SIZE
+    rng = random.Random(options.seed)
+    for index in range(options.trees):
+        pos = (rng.randrange(width - surf.get_width()), rng.randrange(height - surf.get_height()))
+        Tree(pos, surf, [level.all_sprites, level.collision_sprites, level.tree_sprites], 'Large',
+             level.all_sprites, level.player.player_add, level.orchard)
+    return options.frames, None
+
+
+@scenario
+def drops(level, keys, options):
+    # spawn rates that keep about options.drops particles alive, half splashes and half drops
+    rain = level.rain
+    for particles in (rain.floor, rain.drops):
+        particles.set_spawn_rate(options.drops / 2 / np.mean(particles.duration))
+    level.raining = True
+    return options.frames, None
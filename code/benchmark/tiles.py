@@ -0,0 +1,64 @@
+# memory of the static tiles of the map as sprites and as tiles: python -m benchmark.tiles --help
+import argparse
+import time
+import tracemalloc
+
+from benchmark.harness import boot, commit, write_results
+from settings import *
+
+parser = argparse.ArgumentParser(prog='python -m benchmark.tiles',
+                                 description='bytes per static tile (house, fence, water) kept by the camera, as '
+                                             'Generic sprites and as Tile records')
+parser.add_argument('--scale', type=int, default=10,
+                    help='the synthetic map repeats the shipped one scale times in both directions')
+parser.add_argument('--output', help='json file for the results (stdout by default)')
+options = parser.parse_args()
+
+boot()
+from level import CameraGroup
+from mapcache import load_map
+from sprites import Generic, Tile
+
+LAYERS_OF_TILES = ['HouseFloor', 'HouseFurnitureBottom', 'HouseWalls', 'HouseFurnitureTop', 'Fence', 'Water']
+
+tmx_data = load_map('../data/map.tmx')
+map_tiles = [((x * TILE_SIZE, y * TILE_SIZE), surf) for layer in LAYERS_OF_TILES
+             for x, y, surf in tmx_data.tiles(layer)]
+map_width, map_height = tmx_data.width * TILE_SIZE, tmx_data.height * TILE_SIZE
+
+
+def sprites(group, tiles):
+    return [Generic(pos, surf, group) for pos, surf in tiles]
+
+
+def records(group, tiles):
+    new_tiles = [Tile(pos, surf) for pos, surf in tiles]
+    group.add_tiles(new_tiles)
+    return new_tiles
+
+
+# memory traced while the tiles are created and placed in the camera (the surfaces are shared, so they are not counted)
+def measure(build, tiles):
+    group = CameraGroup()
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build(group, tiles)
+    group.render_queue.flush()
+    build_time = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return {'tiles': len(tiles), 'bytes_per_tile': size / len(tiles), 'build_ms': build_time * 1000}
+
+
+maps = {
+    'shipped': map_tiles,
+    'synthetic': [((x + column * map_width, y + row * map_height), surf) for row in range(options.scale)
+                  for column in range(options.scale) for (x, y), surf in map_tiles]}
+results = {'commit': commit(), 'maps': {}}
+for name, tiles in maps.items():
+    generic, tile = measure(sprites, tiles), measure(records, tiles)
+    results['maps'][name] = {'generic': generic, 'tile': tile,
+                             'ratio': generic['bytes_per_tile'] / tile['bytes_per_tile']}
+
+write_results(results, options.output)
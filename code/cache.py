@@ -0,0 +1,24 @@
+import json
+import os
+
+# bump when the layout of the caches changes so they are built again
+CACHE_VERSION = 1
+
+
+# the header of a cache folder when it was built from the sources of the key, None when it is missing or out of date
+def read_header(path, key):
+    try:
+        with open(os.path.join(path, 'header.json'), encoding='utf-8') as file:
+            header = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if header.get('key') != [CACHE_VERSION] + key:
+        return None
+    return header
+
+
+# the header is written last, once the rest of the cache is written: a cache without it is incomplete and is built again
+def write_header(path, key, extra=None):
+    header = dict(extra or {}, key=[CACHE_VERSION] + key)
+    with open(os.path.join(path, 'header.json'), 'w', encoding='utf-8') as file:
+        json.dump(header, file)
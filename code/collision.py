@@ -0,0 +1,51 @@
+import numpy as np
+import pygame
+
+from settings import *
+
+
+# static collision of the map as one boolean per tile, built from the tile layers that block the player
+# a solid tile blocks with the same box a Generic sprite of the tile would have as hitbox, so moving through the map
+# feels the same as with collision sprites
+class CollisionMap:
+    def __init__(self, solid):
+        self.solid = solid
+        self.box = pygame.Rect(0, 0, TILE_SIZE, TILE_SIZE).inflate(-TILE_SIZE * 0.2, -TILE_SIZE * 0.75)
+
+    @classmethod
+    def from_layers(cls, tmx_data, layers):
+        solid = np.zeros((tmx_data.height, tmx_data.width), dtype=bool)
+        for layer in layers:
+            solid |= np.asarray(tmx_data.layer(layer)) > 0
+        return cls(solid)
+
+    # blocking boxes of the solid tiles that collide with the rect
+    def boxes(self, rect):
+        rows, cols = self.solid.shape
+        # tiles whose box can reach the rect (the box is inside its tile)
+        left, right = max(rect.left // TILE_SIZE, 0), min((rect.right - 1) // TILE_SIZE, cols - 1)
+        top, bottom = max(rect.top // TILE_SIZE, 0), min((rect.bottom - 1) // TILE_SIZE, rows - 1)
+        if left > right or top > bottom:
+            return []
+        tiles = np.argwhere(self.solid[top:bottom + 1, left:right + 1])
+        boxes = [self.box.move((left + col) * TILE_SIZE, (top + row) * TILE_SIZE) for row, col in tiles.tolist()]
+        return [box for box in boxes if box.colliderect(rect)]
+
+    # moves the hitbox (that moved from previous along one axis) back to the first box it runs into on its way,
+    # returns whether it was blocked
+    # every tile between the two positions is tested, so a big step can not jump over a box
+    def sweep(self, previous, hitbox, direction, horizontal):
+        boxes = self.boxes(previous.union(hitbox))
+        if not boxes or not direction:
+            return False
+        if horizontal:
+            if direction > 0:
+                hitbox.right = min(box.left for box in boxes)
+            else:
+                hitbox.left = max(box.right for box in boxes)
+        else:
+            if direction > 0:
+                hitbox.bottom = min(box.top for box in boxes)
+            else:
+                hitbox.top = max(box.bottom for box in boxes)
+        return True
@@ -0,0 +1,195 @@
+import numpy as np
+
+from settings import *
+from sprites import Generic
+
+
+# the state that changes at the end of every day is kept in arrays (one slot per crop / apple position) instead of in
+# the sprites, so a new day is a few numpy operations and only the sprites that look different afterwards are touched
+# the arrays also keep the state of the crops and trees whose sprites are not loaded (see world.py)
+
+
+# gives the arrays (attributes of owner) a new capacity, keeping their values
+def resize(owner, names, capacity):
+    for name in names:
+        array = getattr(owner, name)
+        new_array = np.zeros(capacity, dtype=array.dtype)
+        new_array[:len(array)] = array
+        setattr(owner, name, new_array)
+
+
+# age, type and location of every planted crop, freed slots are reused by the next seeds
+# the sprite of a crop (plants[slot]) only exists while its part of the world is loaded
+class Crops:
+    def __init__(self, capacity=64):
+        self.seed_types = list(GROW_SPEED)
+        self.count = 0
+        self.free = []
+        self.plants = []
+        self.age = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.type = np.zeros(capacity, dtype=np.uint8)
+        # index of the last frame of the crop, it is fully grown once its age reaches it
+        self.last_stage = np.zeros(capacity, dtype=int)
+        self.row = np.zeros(capacity, dtype=int)
+        self.col = np.zeros(capacity, dtype=int)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def add(self, row, col, seed_type, stages):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.count == len(self.age):
+                resize(self, ('age', 'speed', 'type', 'last_stage', 'row', 'col', 'active'), len(self.age) * 2)
+            slot = self.count
+            self.count += 1
+            self.plants.append(None)
+
+        self.age[slot] = 0
+        self.speed[slot] = GROW_SPEED[seed_type]
+        self.type[slot] = self.seed_types.index(seed_type)
+        self.last_stage[slot] = stages - 1
+        self.row[slot] = row
+        self.col[slot] = col
+        self.active[slot] = True
+        return slot
+
+    def remove(self, slot):
+        self.active[slot] = False
+        self.plants[slot] = None
+        self.free.append(slot)
+
+    def attach(self, slot, plant):
+        self.plants[slot] = plant
+
+    # the crop keeps growing without a sprite
+    def detach(self, slot):
+        self.plants[slot] = None
+
+    # slots of the crops inside a block of cells
+    def slots_in(self, top, left, bottom, right):
+        count = self.count
+        row, col = self.row[:count], self.col[:count]
+        return np.flatnonzero(self.active[:count] & (row >= top) & (row < bottom) & (col >= left) & (col < right))
+
+    # watered: bool array of the soil grid, the crops on a watered cell that are not fully grown age by their speed
+    def grow(self, watered):
+        count = self.count
+        age = self.age[:count]
+        growing = self.active[:count] & (age < self.last_stage[:count]) & watered[self.row[:count], self.col[:count]]
+        old_stage = age.astype(int)
+        age[growing] += self.speed[:count][growing]
+
+        # a new frame is only shown by the (loaded) plants that reached another stage
+        stage = age.astype(int)
+        for slot in np.flatnonzero(stage != old_stage).tolist():
+            if self.plants[slot]:
+                self.plants[slot].show_stage(int(stage[slot]))
+
+
+# health of every tree and every apple position of the trees, apples regrow each day on the trees that were not cut
+# down
+# the sprite of a tree (and of its apples) only exists while its part of the world is loaded
+class Orchard:
+    def __init__(self, all_sprites, rng, capacity=256):
+        self.all_sprites = all_sprites
+        self.rng = rng
+
+        # trees
+        self.tree_count = 0
+        self.health = np.zeros(capacity // 4, dtype=int)
+        self.alive = np.zeros(capacity // 4, dtype=bool)
+        self.start = np.zeros(capacity // 4, dtype=int)
+        self.end = np.zeros(capacity // 4, dtype=int)
+        self.trees = []
+
+        # apple positions
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=int)
+        self.y = np.zeros(capacity, dtype=int)
+        self.tree = np.zeros(capacity, dtype=int)
+        self.present = np.zeros(capacity, dtype=bool)
+        self.apples = []
+        self.apple_slots = {}
+
+    # registers a tree of the given kind (APPLE_POS) at rect with the apples of its first day, returns its index
+    def add_tree(self, name, rect):
+        index = self.tree_count
+        if index == len(self.health):
+            resize(self, ('health', 'alive', 'start', 'end'), len(self.health) * 2)
+        self.tree_count += 1
+
+        start, end = self.count, self.count + len(APPLE_POS[name])
+        if end > len(self.x):
+            resize(self, ('x', 'y', 'tree', 'present'), max(end, len(self.x) * 2))
+        self.count = end
+
+        self.health[index] = 5
+        self.alive[index] = True
+        self.start[index] = start
+        self.end[index] = end
+        self.trees.append(None)
+
+        positions = np.array(APPLE_POS[name], dtype=int).reshape(-1, 2)
+        self.x[start:end] = positions[:, 0] + rect.left
+        self.y[start:end] = positions[:, 1] + rect.top
+        self.tree[start:end] = index
+        self.present[start:end] = False
+        self.apples.extend([None] * (end - start))
+        self.grow_fruit(start, end)
+        return index
+
+    # the sprite of a tree was loaded, its apples are shown
+    def attach(self, tree):
+        self.trees[tree.index] = tree
+        start, end = self.start[tree.index], self.end[tree.index]
+        for slot in (np.flatnonzero(self.present[start:end]) + start).tolist():
+            self.create_apple(slot)
+
+    def detach(self, tree):
+        for slot in range(self.start[tree.index], self.end[tree.index]):
+            if self.apples[slot]:
+                self.remove_apple(slot)
+        self.trees[tree.index] = None
+
+    # a stump keeps the apples it had when it was cut down, but never grows new ones
+    def fell(self, index):
+        self.alive[index] = False
+
+    def pick(self, apple):
+        slot = self.apple_slots[apple]
+        self.present[slot] = False
+        self.remove_apple(slot)
+
+    def create_apple(self, slot):
+        tree = self.trees[self.tree[slot]]
+        apple = Generic((int(self.x[slot]), int(self.y[slot])), tree.apple_surf,
+                        [tree.apple_sprites, self.all_sprites], LAYERS['fruit'])
+        self.apples[slot] = apple
+        self.apple_slots[apple] = slot
+
+    def remove_apple(self, slot):
+        apple = self.apples[slot]
+        del self.apple_slots[apple]
+        self.apples[slot] = None
+        apple.kill()
+
+    # every apple position of the living trees (between start and end) gets an apple with a chance of FRUIT_CHANCE
+    def grow_fruit(self, start=0, end=None):
+        end = self.count if end is None else end
+        alive = self.alive[self.tree[start:end]]
+        fruit = np.where(alive, self.rng.random(end - start) < FRUIT_CHANCE, self.present[start:end])
+        self.show_fruit(fruit, start)
+
+    # fruit: whether there is an apple at each slot from start on, only the apples that (dis)appear on loaded trees
+    # change sprites
+    def show_fruit(self, fruit, start=0):
+        end = start + len(fruit)
+        present = self.present[start:end]
+        changed = (np.flatnonzero(present != fruit) + start).tolist()
+        present[:] = fruit
+        for slot in changed:
+            if self.apples[slot]:
+                self.remove_apple(slot)
+            elif self.present[slot] and self.trees[self.tree[slot]]:
+                self.create_apple(slot)
@@ -0,0 +1,19 @@
+import pygame
+
+# Player and Menu read the keys from here instead of pygame directly, so scripted input (benchmarks) can take the
+# place of the real keyboard
+source = pygame.key.get_pressed
+
+
+def get_pressed():
+    return source()
+
+
+# func is called once per input check and has to return something indexable by pygame key constants
+def set_source(func):
+    global source
+    source = func
+
+
+def reset_source():
+    set_source(pygame.key.get_pressed)
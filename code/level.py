@@ -1,90 +1,95 @@
 from random import randint
 
+import numpy as np
 import pygame
-from pytmx.util_pygame import load_pygame
 
+from audio import audio
+from collision import CollisionMap
+from daytick import Orchard
+from mapcache import load_map
 from menu import Menu
 from overlay import Overlay
 from player import Player
+from profiler import Profiler
+from render import RenderQueue
+from save import SaveGame
 from settings import *
 from sky import Rain, Sky
 from soil import SoilLayer
-from sprites import Generic, Water, WildFlower, Tree, Interaction
+from spatial import SpatialGroup, SpatialHash
+from sprites import Interaction
+from timer import scheduler, ui_scheduler
+from tint import Tint
 from transition import Transition
-from util import *
+from world import World
 
 
 # make rain random after reset instead of using input
 class Level:
-    def __init__(self):
+    def __init__(self, seed=None, save_path=SAVE_PATH):
         # get the display surface
         self.display_surface = pygame.display.get_surface()
+        # the random generator of the simulation (rain, fruit), a seed makes a level repeatable
+        self.rng = np.random.default_rng(seed)
+        # a new level starts new game and ui clocks
+        scheduler.clear()
+        scheduler.scale = TIME_SCALE
+        scheduler.paused = False
+        ui_scheduler.clear()
 
         # sprite groups
         self.all_sprites = CameraGroup()
-        self.collision_sprites = pygame.sprite.Group()
-        self.tree_sprites = pygame.sprite.Group()
-        self.interaction_sprites = pygame.sprite.Group()
-        self.soil_layer = SoilLayer(self.all_sprites, self.collision_sprites)
+        # the groups the player queries share one spatial hash so only the sprites around it are tested
+        self.spatial_hash = SpatialHash()
+        self.collision_sprites = SpatialGroup(self.spatial_hash)
+        self.tree_sprites = SpatialGroup(self.spatial_hash)
+        self.interaction_sprites = SpatialGroup(self.spatial_hash)
+
+        # the map is parsed once (or loaded from its compiled cache) and shared with the soil layer
+        self.tmx_data = load_map('../data/map.tmx')
+        # the collision and fence tiles never move, they block the player through a tile map instead of sprites
+        self.collision_map = CollisionMap.from_layers(self.tmx_data, ['Collision', 'Fence'])
+        self.soil_layer = SoilLayer(self.all_sprites, self.collision_sprites, self.tmx_data)
+        self.orchard = Orchard(self.all_sprites, self.rng)
 
         self.setup()
+        # only the part of the map around the player is built (and kept up to date in update)
+        self.world = World(self.tmx_data, self.all_sprites, self.collision_sprites, self.tree_sprites,
+                           self.soil_layer, self.orchard, self.player)
+        # the farm of the last save (no save path -> a new farm that is never saved)
+        self.save_game = SaveGame(save_path) if save_path else None
+        if self.save_game:
+            self.save_game.load(self)
+        self.world.update()
         self.overlay = Overlay(self.player)
 
         # sky
-        self.rain = Rain(self.all_sprites)
+        map_rect = pygame.Rect(0, 0, self.tmx_data.width * TILE_SIZE, self.tmx_data.height * TILE_SIZE)
+        self.rain = Rain(self.all_sprites, self.rng, map_rect)
         self.raining = randint(0, 10) > 7
-        self.sky = Sky(self.reset)
+        # the sky and the sleep transition darken the screen through one shared tint pass
+        self.tint = Tint()
+        self.sky = Sky(self.reset, self.tint)
 
-        self.transition = Transition(self.reset, self.player, self.sky)
+        self.transition = Transition(self.reset, self.player, self.sky, self.tint)
 
         # shop
         self.shop_active = False
         self.menu = Menu(self.player, self.toggle_shop)
 
-        # background music
-        self.background_music = pygame.mixer.Sound('../audio/bg.mp3')
-        self.background_music.set_volume(0.2)
-        self.background_music.play(loops=-1)
+        # background music (streamed from the file)
+        audio.play_music()
+
+        # frame profiler (F3)
+        self.profiler = Profiler()
 
     def setup(self):
-        tmx_data = load_pygame('../data/map.tmx')
-
-        # importing items in the map and placing in the game surface
-        # house -> need to multiply the position by the tile size
-        for layer in ['HouseFloor', 'HouseFurnitureBottom']:
-            for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                Generic((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites, LAYERS['house bottom'])
-
-        for layer in ['HouseWalls', 'HouseFurnitureTop']:
-            for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                Generic((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites)
-
-        # fence
-        for x, y, surf in tmx_data.get_layer_by_name('Fence').tiles():
-            Generic((x * TILE_SIZE, y * TILE_SIZE), surf, [self.all_sprites, self.collision_sprites])
-
-        # water ( is animated so we need to import all the frames)
-        water_frames = import_folder('../graphics/water')
-        for x, y, surf in tmx_data.get_layer_by_name('Water').tiles():
-            Water((x * TILE_SIZE, y * TILE_SIZE), water_frames, self.all_sprites)
-
-        # wildflowers
-        for obj in tmx_data.get_layer_by_name('Decoration'):
-            WildFlower((obj.x, obj.y), obj.image, [self.all_sprites, self.collision_sprites])
-
-        # Question why we do not add the items in the collision layer to the collision group while we are importing
-        #  them? maybe because they are wrapped in a named layer and not all the items in that layer are collidable
-        #  collision tiles (not in the all_sprite group so it is not updated or drawn) also some parts of the map
-        #  such as lawns that are not imported but part of the map itself can have collsion through this method
-        for x, y, surf in tmx_data.get_layer_by_name('Collision').tiles():
-            Generic((x * TILE_SIZE, y * TILE_SIZE), pygame.Surface((TILE_SIZE, TILE_SIZE)), self.collision_sprites)
-
-        # player
-        for obj in tmx_data.get_layer_by_name('Player'):
+        # the map itself (house, fence, water, wildflowers, trees and the ground) is built by the world, chunk by chunk
+        for obj in self.tmx_data.get_objects('Player'):
             if obj.name == 'Start':
                 self.player = Player(
-                    (obj.x, obj.y), self.all_sprites, self.all_sprites, self.collision_sprites, self.tree_sprites,
-                    self.interaction_sprites, self.soil_layer, self.toggle_shop)
+                    (obj.x, obj.y), self.all_sprites, self.all_sprites, self.collision_map, self.collision_sprites,
+                    self.tree_sprites, self.interaction_sprites, self.soil_layer, self.toggle_shop)
 
             if obj.name == 'Bed':
                 Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
@@ -92,15 +97,10 @@ class Level:
             if obj.name == 'Trader':
                 Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
 
-        # trees
-        for obj in tmx_data.get_layer_by_name('Trees'):
-            Tree((obj.x, obj.y), obj.image, [self.all_sprites, self.collision_sprites, self.tree_sprites],
-                 obj.name, self.all_sprites, self.player.player_add)
-        Generic((0, 0), pygame.image.load('../graphics/world/ground.png').convert_alpha(), self.all_sprites,
-                LAYERS['ground'])
-
     def toggle_shop(self):
         self.shop_active = not self.shop_active
+        # the game stands still while the shop is open
+        scheduler.paused = self.shop_active
 
     # when the sky gets dark enough, it should call the reset to start the new day
     def reset(self):
@@ -109,36 +109,66 @@ class Level:
         self.soil_layer.grow_plants()
         self.soil_layer.remove_water()
 
-        # trees (apples regrow) if the tree is not cut down
-        for tree in self.tree_sprites.sprites():
-            if tree.alive:
-                # destroy previous apples
-                for apple in tree.apple_sprites.sprites():
-                    apple.kill()
-                tree.create_fruit()
+        # apples regrow on the trees that were not cut down
+        self.orchard.grow_fruit()
+
+        # autosave (written in the background)
+        if self.save_game:
+            self.save_game.save(self)
+
+    # one step of the simulation
+    def update(self, dt):
+        # every stage goes through the profiler so it can be timed (when it is enabled)
+        profiler = self.profiler
+        # chunks around the player are loaded before anything looks at them
+        profiler.time('world', self.world.update)
+        # positions before the step, moving sprites are drawn between them and the positions after it
+        self.all_sprites.snapshot()
+        # the clocks run the timers that are due, the step lasts dt of game time (scaled, nothing while paused)
+        profiler.time('timers', ui_scheduler.advance, dt)
+        dt = profiler.time('timers', scheduler.advance, dt)
+
+        # daytime
+        if not self.player.sleep:
+            profiler.time('sky', self.sky.update, dt)
+
+        # updates
+        if self.shop_active:
+            profiler.time('menu', self.menu.update)
+        else:
+            profiler.time('update', self.all_sprites.update, dt)
+            profiler.time('world', self.world.animate, dt)
+            # the rain keeps ageing its particles after it stops so the last drops disappear
+            profiler.time('rain', self.rain.update, dt, self.player, self.raining)
+            if self.raining:
+                profiler.time('water_all', self.soil_layer.water_all)
+
+        if self.player.sleep:
+            profiler.time('transition', self.transition.update, dt)
+
+    # alpha: how far the simulation is between the last step and the next one
+    def draw(self, alpha=1):
+        profiler = self.profiler
 
-    def run(self, dt):
-        # drawing logic
-        keys = pygame.key.get_pressed()
         self.display_surface.fill('black')
-        self.all_sprites.custom_draw(self.player)
+        profiler.time('custom_draw', self.all_sprites.custom_draw, self.player, alpha)
 
-        # daytime ( sky is drawn first so the overlay appears just afterward
+        # sky is drawn first so the overlay appears just afterward
         if not self.player.sleep:
-            self.sky.display(dt)
+            profiler.time('sky', self.sky.display)
 
-        # updates
         if self.shop_active:
-            self.menu.update()
+            profiler.time('menu', self.menu.display)
         else:
-            self.all_sprites.update(dt)
-            if self.raining:
-                self.rain.update()
-                self.soil_layer.water_all()
-            self.overlay.display()
+            profiler.time('overlay', self.overlay.display)
 
         if self.player.sleep:
-            self.transition.play(dt)
+            profiler.time('transition', self.transition.display)
+
+    # a frame with a variable time step
+    def run(self, dt):
+        self.update(dt)
+        self.draw()
 
 
 class CameraGroup(pygame.sprite.Group):
@@ -146,26 +176,83 @@ class CameraGroup(pygame.sprite.Group):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
-
-    def custom_draw(self, player):
-        # finding the vector from center to players current position
-        # this vector is used (in reverse direction (-)) to draw everything else in the map
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
-        # use the layer to draw sprites in the correct depth order use sort to sort items based on their y position
+        # part of the world that is on the screen
+        self.view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        # sprites are kept sorted by layer and y when they join/leave the group instead of sorting them every frame
+        self.render_queue = RenderQueue()
+        # things that are not sprites (e.g rain particles) can be drawn on top of the sprites of a layer
+        self.layer_draws = {}
+        # positions of the moving sprites before the last simulation step
+        self.previous = {}
+
+    # tiles (see Tile) are drawn like the sprites of the group without being part of it
+    def add_tiles(self, tiles):
+        self.render_queue.add_tiles(tiles)
+
+    def remove_tiles(self, tiles):
+        self.render_queue.remove_tiles(tiles)
+
+    def add_layer_draw(self, layer, draw):
+        self.layer_draws.setdefault(layer, []).append(draw)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.render_queue.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.render_queue.remove(sprite)
+
+    # called by sprites that changed their layer or position outside of update (e.g a plant growing)
+    def refresh(self, sprite):
+        self.render_queue.refresh(sprite)
+
+    def snapshot(self):
+        self.previous = {sprite: sprite.rect.topleft for sprite in self.render_queue.moving_sprites()}
+
+    # where the moving sprites are drawn: alpha of the way from their previous position to the current one
+    def interpolate(self, alpha):
+        if alpha >= 1:
+            return {}
+        positions = {}
+        for sprite, (x, y) in self.previous.items():
+            if sprite in self.spritedict:
+                positions[sprite] = (round(x + (sprite.rect.x - x) * alpha), round(y + (sprite.rect.y - y) * alpha))
+        return positions
+
+    # finding the vector from center to players position (player_x, player_y)
+    # this vector is used (in reverse direction (-)) to draw everything else in the map
+    def camera_offset(self, player, player_x, player_y):
+        return (player_x + player.rect.width // 2 - SCREEN_WIDTH / 2,
+                player_y + player.rect.height // 2 - SCREEN_HEIGHT / 2)
+
+    def custom_draw(self, player, alpha=1):
+        positions = self.interpolate(alpha)
+        player_x, player_y = positions.get(player, player.rect.topleft)
+        self.offset.x, self.offset.y = self.camera_offset(player, player_x, player_y)
+        offset_x, offset_y = int(self.offset.x), int(self.offset.y)
+        # only the part of the world inside the camera is drawn
+        self.view.topleft = (offset_x, offset_y)
+        # the render queue gives the sprites layer by layer, sorted by their y position inside each layer
         # for the behind/front effect -> items with lower y -> behind -> so drawn first
-        for layer in LAYERS.values():
-            for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-                if sprite.z == layer:
-                    offset_rect = sprite.rect.copy()
-                    offset_rect.center -= self.offset
-                    self.display_surface.blit(sprite.image, offset_rect)
-
-                    # # analytics (for test purpose)
-                    # if sprite == player:
-                    #     pygame.draw.rect(self.display_surface, 'red', offset_rect, 5)
-                    #     hitbox_rect = player.hitbox.copy()
-                    #     hitbox_rect.center = offset_rect.center
-                    #     pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
-                    #     target_pos = offset_rect.center + PLAYER_TOOL_OFFSET[player.dir]
-                    #     pygame.draw.circle(self.display_surface, 'blue', target_pos, 5)
+        for layer, sprites in self.render_queue.layers(self.view):
+            if positions:
+                self.display_surface.blits(
+                    [(sprite.image, (positions[sprite][0] - offset_x, positions[sprite][1] - offset_y))
+                     if sprite in positions else (sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y))
+                     for sprite in sprites], False)
+            else:
+                self.display_surface.blits(
+                    [(sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)) for sprite in sprites], False)
+            for draw in self.layer_draws.get(layer, ()):
+                draw(self.display_surface, (offset_x, offset_y))
+
+            # # analytics (for test purpose)
+            # if layer == player.z:
+            #     offset_rect = player.rect.move(-offset_x, -offset_y)
+            #     pygame.draw.rect(self.display_surface, 'red', offset_rect, 5)
+            #     hitbox_rect = player.hitbox.copy()
+            #     hitbox_rect.center = offset_rect.center
+            #     pygame.draw.rect(self.display_surface, 'green', hitbox_rect, 5)
+            #     target_pos = offset_rect.center + PLAYER_TOOL_OFFSET[player.dir]
+            #     pygame.draw.circle(self.display_surface, 'blue', target_pos, 5)
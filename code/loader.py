@@ -0,0 +1,76 @@
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pygame
+
+from assets import assets
+from atlas import add_family, read_family
+from settings import *
+from world import ground_cache
+
+# images that are not part of an atlas family but are needed by the level as soon as it starts
+IMAGES = ['../graphics/stumps/large.png', '../graphics/stumps/small.png']
+
+
+# decodes what the level needs before it is built: the pngs and sounds are read by a pool of threads (decoding releases
+# the gil) while the main thread keeps a loading screen responsive and converts every finished image to the display
+# format (which has to happen on the main thread), then puts it in the asset registry
+class Loader:
+    def __init__(self, threads=LOADER_THREADS):
+        self.display_surface = pygame.display.get_surface()
+        self.text_surf = assets.font('../font/LycheeSoda.ttf', 30).render('Loading', False, 'White')
+        self.executor = ThreadPoolExecutor(threads or os.cpu_count())
+
+        # future of every job -> what the main thread does with its result
+        self.jobs = {}
+        for family in ATLAS_FAMILIES:
+            self.add(lambda sheet_rects, family=family: add_family(family, *sheet_rects), read_family, family)
+        for path in IMAGES:
+            self.add(lambda surf, path=path: assets.add_image(path, surf.convert_alpha()), pygame.image.load, path)
+        if pygame.mixer.get_init():
+            for name, (path, volume, category, interval) in SOUNDS.items():
+                self.add(lambda sound, path=path, volume=volume: assets.add_sound(path, sound, volume),
+                         pygame.mixer.Sound, path)
+        # (the ground is only cut in pieces on the first launch)
+        self.add(None, ground_cache, '../graphics/world/ground.png', STREAM_CHUNK_SIZE)
+        self.total = len(self.jobs)
+
+    def add(self, finish, decode, *args):
+        self.jobs[self.executor.submit(decode, *args)] = finish
+
+    @property
+    def progress(self):
+        return 1 - len(self.jobs) / self.total
+
+    # blocks until everything is loaded, drawing the loading screen whenever a job finishes (or every frame)
+    def run(self):
+        while self.jobs:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    pygame.quit()
+                    sys.exit()
+
+            done, _ = wait(self.jobs, timeout=1 / 60, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish = self.jobs.pop(future)
+                result = future.result()
+                if finish:
+                    finish(result)
+
+            self.display()
+            pygame.display.update()
+        self.executor.shutdown()
+
+    def display(self):
+        self.display_surface.fill('black')
+        text_rect = self.text_surf.get_rect(midbottom=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 - 20))
+        self.display_surface.blit(self.text_surf, text_rect)
+
+        bar_rect = pygame.Rect(0, 0, SCREEN_WIDTH / 3, 20)
+        bar_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 10)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = bar_rect.width * self.progress
+        pygame.draw.rect(self.display_surface, 'White', fill_rect, 0, 4)
+        pygame.draw.rect(self.display_surface, 'White', bar_rect, 2, 4)
@@ -1,28 +1,102 @@
+import argparse
+import os
+import random
 import sys
 import pygame
+import keyboard
 from level import Level
+from loader import Loader
+from replay import Recorder
 from settings import *
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, save_path=SAVE_PATH, recorder=None):
         pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        if VSYNC:
+            # vsync needs a renderer, which pygame only uses for scaled windows
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.clock = pygame.time.Clock()
         pygame.display.set_caption('MoonDewDew')
-        self.level = Level()
+        # the level is only built once its images and sounds are decoded (behind a loading screen)
+        Loader().run()
+        self.level = Level(seed, save_path)
+
+        # time that still has to be simulated with steps of a fixed length
+        self.step = 1 / SIMULATION_RATE
+        self.accumulator = 0
+
+        # a recorded session gives the game the keys it sampled for each frame
+        self.recorder = recorder
+        if recorder:
+            keyboard.set_source(recorder.get_pressed)
 
     def run(self):
+        profiler = self.level.profiler
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    # an autosave that is still being written is finished first
+                    if self.level.save_game:
+                        self.level.save_game.wait()
+                    if self.recorder:
+                        self.recorder.save(self.level)
                     pygame.quit()
                     sys.exit()
-            dt = self.clock.tick() / 1000
-            self.level.run(dt)
-            pygame.display.update()
+                # F3 shows the frame profiler, F4 saves its last seconds
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    profiler.dump()
+            # the clock sleeps to keep the frame rate under the cap instead of spinning
+            frame_time = min(self.clock.tick(RENDER_FPS) / 1000, MAX_FRAME_TIME)
+            if self.recorder:
+                self.recorder.record(frame_time)
+            profiler.begin_frame()
+            self.frame(frame_time)
+            profiler.display()
+            profiler.time('display_update', pygame.display.update)
+            profiler.end_frame()
+
+    # simulates frame_time seconds and draws the result (unless render is off, e.g replays at full speed)
+    def frame(self, frame_time, render=True):
+        if FIXED_TIMESTEP:
+            self.accumulator += frame_time
+            steps = 0
+            while self.accumulator >= self.step and steps < MAX_SIMULATION_STEPS:
+                self.level.update(self.step)
+                self.accumulator -= self.step
+                steps += 1
+            # whatever could not be caught up is dropped (spiral of death)
+            if steps == MAX_SIMULATION_STEPS:
+                self.accumulator = min(self.accumulator, self.step)
+            if render:
+                self.level.draw(self.accumulator / self.step)
+        else:
+            self.level.update(frame_time)
+            if render:
+                self.level.draw()
 
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(prog='python main.py')
+    parser.add_argument('--record', metavar='PATH',
+                        help='records the session (replay it with python -m benchmark.replay PATH)')
+    options = parser.parse_args()
+
+    recorder = None
+    seed = None
+    if options.record:
+        # every random generator of the game is seeded, so the replay makes the same random choices
+        seed = random.SystemRandom().randrange(2 ** 32)
+        random.seed(seed)
+        start = b''
+        if os.path.exists(SAVE_PATH):
+            with open(SAVE_PATH, 'rb') as file:
+                start = file.read()
+        recorder = Recorder(options.record, seed, start)
+
+    game = Game(seed, recorder=recorder)
     game.run()
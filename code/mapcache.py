@@ -0,0 +1,176 @@
+import os
+import re
+import time
+
+import numpy as np
+import pygame
+from pytmx import TiledObjectGroup, TiledTileLayer
+from pytmx.util_pygame import load_pygame
+
+from atlas import build_sheet, subsurfaces
+from cache import read_header, write_header
+
+OBJECT_RECORD = np.dtype([('layer', np.uint16), ('name', np.uint16), ('x', np.float32), ('y', np.float32),
+                          ('width', np.float32), ('height', np.float32), ('tile', np.uint32)])
+
+
+class MapObject:
+    __slots__ = ('name', 'x', 'y', 'width', 'height', 'image')
+
+    def __init__(self, name, x, y, width, height, image):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.image = image
+
+
+# the map after it was parsed once: every tile layer is an array of tile ids (0 -> empty tile), object layers are
+# records and all the tile images live in one atlas surface
+class CompiledMap:
+    def __init__(self, width, height, tile_size, layer_names, layers, object_layer_names, object_names, objects,
+                 tile_surfs):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.layer_names = layer_names
+        self.layers = layers
+        self.object_layer_names = object_layer_names
+        self.object_names = object_names
+        self.objects = objects
+        self.tile_surfs = tile_surfs
+
+        # filled by load_map
+        self.from_cache = False
+        self.load_time = 0
+
+    def layer(self, name):
+        return self.layers[self.layer_names.index(name)]
+
+    # (x, y, surf) of every tile in a tile layer, like the tiles() of a pytmx layer
+    # area: only the tiles of a block of the map (top, left, bottom, right in tiles, bottom and right exclusive)
+    def tiles(self, name, area=None):
+        top, left, bottom, right = area or (0, 0, self.height, self.width)
+        data = self.layer(name)[top:bottom, left:right]
+        for y, x in np.argwhere(data).tolist():
+            yield left + x, top + y, self.tile_surfs[data[y, x]]
+
+    # objects of an object layer in the order of the map file
+    def get_objects(self, name):
+        records = self.objects[self.objects['layer'] == self.object_layer_names.index(name)]
+        return [MapObject(self.object_names[record['name']] or None, float(record['x']), float(record['y']),
+                          float(record['width']), float(record['height']), self.tile_surfs[record['tile']])
+                for record in records]
+
+
+def cache_path(tmx_path):
+    return os.path.splitext(tmx_path)[0] + '.cache'
+
+
+# the cache is valid as long as the map, its tilesets and their images were not modified
+def source_key(tmx_path):
+    files = [tmx_path]
+    with open(tmx_path, encoding='utf-8') as file:
+        tmx = file.read()
+    for tsx in re.findall(r'<tileset [^>]*source="([^"]+)"', tmx):
+        tsx_path = os.path.join(os.path.dirname(tmx_path), tsx)
+        files.append(tsx_path)
+        with open(tsx_path, encoding='utf-8') as file:
+            tileset = file.read()
+        for image in re.findall(r'<image [^>]*source="([^"]+)"', tileset):
+            files.append(os.path.join(os.path.dirname(tsx_path), image))
+    key = []
+    for file in files:
+        stat = os.stat(file)
+        key.append([os.path.normpath(file), stat.st_mtime_ns, stat.st_size])
+    return key
+
+
+def compile_map(tmx_path):
+    tmx_data = load_pygame(tmx_path)
+
+    # gids of pytmx -> ids of the compiled map (only the images that are used end in the atlas)
+    tile_ids = {}
+    images = []
+
+    def tile_id(gid):
+        if not gid or tmx_data.images[gid] is None:
+            return 0
+        if gid not in tile_ids:
+            images.append(tmx_data.images[gid])
+            tile_ids[gid] = len(images)
+        return tile_ids[gid]
+
+    layer_names, layers = [], []
+    object_layer_names, object_names, records = [], [''], []
+    for layer in tmx_data.layers:
+        if isinstance(layer, TiledTileLayer):
+            layer_names.append(layer.name)
+            layers.append([[tile_id(gid) for gid in row] for row in layer.data])
+        elif isinstance(layer, TiledObjectGroup):
+            object_layer_names.append(layer.name)
+            for obj in layer:
+                if obj.name and obj.name not in object_names:
+                    object_names.append(obj.name)
+                records.append((len(object_layer_names) - 1, object_names.index(obj.name or ''), obj.x, obj.y,
+                                obj.width, obj.height, tile_id(obj.gid)))
+
+    layers = np.array(layers, dtype=np.uint16).reshape(len(layer_names), tmx_data.height, tmx_data.width)
+    objects = np.array(records, dtype=OBJECT_RECORD)
+    atlas, rects = build_sheet(images)
+
+    # write the cache
+    path = cache_path(tmx_path)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'layers.npy'), layers)
+    np.save(os.path.join(path, 'objects.npy'), objects)
+    pygame.image.save(atlas, os.path.join(path, 'atlas.png'))
+    write_header(path, source_key(tmx_path), {
+        'size': [tmx_data.width, tmx_data.height, tmx_data.tilewidth],
+        'layers': layer_names,
+        'object_layers': object_layer_names,
+        'object_names': object_names,
+        'tiles': [list(rect) for rect in rects]})
+
+    return CompiledMap(tmx_data.width, tmx_data.height, tmx_data.tilewidth, layer_names, layers, object_layer_names,
+                       object_names, objects, [None] + subsurfaces(atlas.convert_alpha(), rects))
+
+
+def read_cache(tmx_path):
+    path = cache_path(tmx_path)
+    header = read_header(path, source_key(tmx_path))
+    if header is None:
+        return None
+
+    width, height, tile_size = header['size']
+    layers = np.load(os.path.join(path, 'layers.npy'), mmap_mode='r')
+    objects = np.load(os.path.join(path, 'objects.npy'), mmap_mode='r')
+    atlas = pygame.image.load(os.path.join(path, 'atlas.png')).convert_alpha()
+    return CompiledMap(width, height, tile_size, header['layers'], layers, header['object_layers'],
+                       header['object_names'], objects, [None] + subsurfaces(atlas, header['tiles']))
+
+
+# the map is parsed from the tmx file only when its cache is missing or out of date
+def load_map(tmx_path):
+    start = time.perf_counter()
+    compiled_map = read_cache(tmx_path)
+    from_cache = compiled_map is not None
+    if not from_cache:
+        compiled_map = compile_map(tmx_path)
+    compiled_map.from_cache = from_cache
+    compiled_map.load_time = time.perf_counter() - start
+    return compiled_map
+
+
+# python mapcache.py -> compiles the map and reports cold (tmx) and warm (cache) loading times
+if __name__ == '__main__':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    start = time.perf_counter()
+    compile_map('../data/map.tmx')
+    cold_time = time.perf_counter() - start
+    warm_time = load_map('../data/map.tmx').load_time
+    print(f'cold (tmx): {cold_time * 1000:.1f} ms, warm (cache): {warm_time * 1000:.1f} ms')
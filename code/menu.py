@@ -1,7 +1,10 @@
 import pygame
 
+import keyboard
+from assets import assets
 from settings import *
-from timer import Timer
+from timer import Timer, ui_scheduler
+from ui import CachedSurface, TextCache
 
 
 class Menu:
@@ -10,7 +13,8 @@ class Menu:
         self.player = player
         self.toggle_menu = toggle_menu
         self.display_surface = pygame.display.get_surface()
-        self.font = pygame.font.Font('../font/LycheeSoda.ttf', 30)
+        self.font = assets.font('../font/LycheeSoda.ttf', 30)
+        self.text_cache = TextCache(self.font)
 
         # options
         self.width = 400
@@ -24,13 +28,21 @@ class Menu:
 
         # movement
         self.index = 0
-        self.timer = Timer(200)
+        # (the game is paused while the menu is open, so it runs on the time of the ui)
+        self.timer = Timer(200, clock=ui_scheduler)
 
-    def display_money(self):
-        text_surf = self.font.render(f'${self.player.money}', False, 'Black')
-        text_rect = text_surf.get_rect(midbottom=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20))
-        pygame.draw.rect(self.display_surface, 'White', text_rect.inflate(10, 10), 0, 6)
-        self.display_surface.blit(text_surf, text_rect)
+        # the whole shop (entries and money) is composited in one surface, built again only when it changes
+        self.panel = CachedSurface(self.build_panel)
+
+    def money_rect(self):
+        text_surf = self.text_cache.render(f'${self.player.money}', 'Black')
+        return text_surf, text_surf.get_rect(midbottom=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 20))
+
+    def display_money(self, surface, offset):
+        text_surf, text_rect = self.money_rect()
+        text_rect.move_ip(offset)
+        pygame.draw.rect(surface, 'White', text_rect.inflate(10, 10), 0, 6)
+        surface.blit(text_surf, text_rect)
 
     def setup(self):
         # create the text surface
@@ -51,8 +63,7 @@ class Menu:
     def input(self):
         # get input
         # if player presses escape close the menu
-        keys = pygame.key.get_pressed()
-        self.timer.update()
+        keys = keyboard.get_pressed()
 
         if keys[pygame.K_ESCAPE]:
             self.toggle_menu()
@@ -87,34 +98,48 @@ class Menu:
                     self.player.seed_inventory[current_item] += 1
                     self.player.money -= PURCHASE_PRICES[current_item]
 
-    def show_entry(self, text_surf, amount, top, selected):
+    def show_entry(self, surface, offset, text_surf, amount, top, selected):
+        main_rect = self.main_rect.move(offset)
         # background
-        bg_rect = pygame.Rect(self.main_rect.left, top, self.width, text_surf.get_height() + (self.padding * 2))
-        pygame.draw.rect(self.display_surface, 'White', bg_rect, 0, 4)
+        bg_rect = pygame.Rect(main_rect.left, top + offset[1], self.width, text_surf.get_height() + (self.padding * 2))
+        pygame.draw.rect(surface, 'White', bg_rect, 0, 4)
         # text
-        text_rect = text_surf.get_rect(midleft=(self.main_rect.left + 20, bg_rect.centery))
-        self.display_surface.blit(text_surf, text_rect)
+        text_rect = text_surf.get_rect(midleft=(main_rect.left + 20, bg_rect.centery))
+        surface.blit(text_surf, text_rect)
 
         # amount
-        amount_surf = self.font.render(str(amount), False, 'Black')
-        amount_rect = amount_surf.get_rect(midright=(self.main_rect.right - 20, bg_rect.centery))
-        self.display_surface.blit(amount_surf, amount_rect)
+        amount_surf = self.text_cache.render(str(amount), 'Black')
+        amount_rect = amount_surf.get_rect(midright=(main_rect.right - 20, bg_rect.centery))
+        surface.blit(amount_surf, amount_rect)
 
         # show a black outline around the selected item
         if selected:
-            pygame.draw.rect(self.display_surface, 'black', bg_rect, 4, 4)
+            pygame.draw.rect(surface, 'black', bg_rect, 4, 4)
 
             if self.index > self.sell_border:
-                pos_rect = self.sell_text.get_rect(midleft=(self.main_rect.left + 150, bg_rect.centery))
-                self.display_surface.blit(self.buy_text, pos_rect)
+                pos_rect = self.sell_text.get_rect(midleft=(main_rect.left + 150, bg_rect.centery))
+                surface.blit(self.buy_text, pos_rect)
             else:
-                pos_rect = self.buy_text.get_rect(midleft=(self.main_rect.left + 150, bg_rect.centery))
-                self.display_surface.blit(self.sell_text, pos_rect)
-    def update(self):
-        self.input()
-        self.display_money()
+                pos_rect = self.buy_text.get_rect(midleft=(main_rect.left + 150, bg_rect.centery))
+                surface.blit(self.sell_text, pos_rect)
+
+    def build_panel(self):
+        _, money_rect = self.money_rect()
+        rect = self.main_rect.union(money_rect.inflate(10, 10))
+        surf = pygame.Surface(rect.size, pygame.SRCALPHA).convert_alpha()
+        offset = (-rect.x, -rect.y)
+
+        self.display_money(surf, offset)
         amount_list = list(self.player.item_inventory.values()) + list(self.player.seed_inventory.values())
-        # pygame.draw.rect(self.display_surface, 'red', self.main_rect)
         for index, text_surf in enumerate(self.text_surfs):
             top = self.main_rect.top + index * (text_surf.get_height() + self.padding * 2 + self.space)
-            self.show_entry(text_surf, amount_list[index], top, self.index == index)
+            self.show_entry(surf, offset, text_surf, amount_list[index], top, self.index == index)
+        return surf, rect
+
+    def update(self):
+        self.input()
+
+    def display(self):
+        key = (self.player.money, tuple(self.player.item_inventory.values()),
+               tuple(self.player.seed_inventory.values()), self.index)
+        self.panel.draw(self.display_surface, key)
@@ -1,6 +1,8 @@
 import pygame
 
+from assets import assets
 from settings import *
+from ui import CachedSurface
 
 
 class Overlay:
@@ -11,16 +13,25 @@ class Overlay:
 
         # imports
         overlay_path = '../graphics/overlay/'
-        self.tools_surf = {tool: pygame.image.load(f'{overlay_path}{tool}.png').convert_alpha() for tool in
-                           player.tools}
-        self.seeds_surf = {seed: pygame.image.load(f'{overlay_path}{seed}.png') for seed in player.seeds}
+        self.tools_surf = {tool: assets.image(f'{overlay_path}{tool}.png') for tool in player.tools}
+        self.seeds_surf = {seed: assets.image(f'{overlay_path}{seed}.png') for seed in player.seeds}
 
-    def display(self):
+        # both icons are composited together and built again only when the selected tool or seed changes
+        self.hud = CachedSurface(self.build_hud)
+
+    def build_hud(self):
         # tool
         tool_surf = self.tools_surf[self.player.tools[self.player.tool_index]]
         tool_rect = tool_surf.get_rect(midbottom=OVERLAY_POSITIONS['tool'])
-        self.display_surface.blit(tool_surf, tool_rect)
         # seeds
         seed_surf = self.seeds_surf[self.player.selected_seed]
         seed_rect = seed_surf.get_rect(midbottom=OVERLAY_POSITIONS['seed'])
-        self.display_surface.blit(seed_surf, seed_rect)
+
+        rect = tool_rect.union(seed_rect)
+        surf = pygame.Surface(rect.size, pygame.SRCALPHA).convert_alpha()
+        surf.blit(tool_surf, tool_rect.move(-rect.x, -rect.y))
+        surf.blit(seed_surf, seed_rect.move(-rect.x, -rect.y))
+        return surf, rect
+
+    def display(self):
+        self.hud.draw(self.display_surface, (self.player.tool_index, self.player.seed_index))
@@ -1,9 +1,11 @@
 import pygame
 
+import keyboard
+from assets import assets
+from audio import audio
 from settings import *
 from sprites import Particle
 from timer import Timer
-from util import *
 
 
 # TODO have a sprite class that all interactable sprites inherit from
@@ -12,8 +14,8 @@ from util import *
 #  Question why player is not inheriting the Generic?
 # TODO Player already has access to tree sprites so why using the level as an intermediary?
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, group, all_sprites, collision_sprites, tree_sprites, interaction_sprite, soil_layer,
-                 toggle_shop):
+    def __init__(self, pos, group, all_sprites, collision_map, collision_sprites, tree_sprites, interaction_sprite,
+                 soil_layer, toggle_shop):
         super().__init__(group)
         self.all_sprites = all_sprites
         self.import_assets()
@@ -33,8 +35,11 @@ class Player(pygame.sprite.Sprite):
         # we use a different attribute for position because rect only store integer which does not work with delta time
         self.pos = pygame.math.Vector2(self.rect.center)
         self.speed = 200
+        # the player moves every frame so the camera sorts it again each frame instead of keeping its place
+        self.moving = True
 
-        # collision
+        # collision: the static tiles of the map are a tile map, everything else (trees, plants, ...) is a sprite
+        self.collision_map = collision_map
         self.collision_sprites = collision_sprites
         self.hitbox = self.rect.copy().inflate((-126, -70))
 
@@ -63,14 +68,6 @@ class Player(pygame.sprite.Sprite):
         self.soil_layer = soil_layer
         self.toggle_shop = toggle_shop
 
-        # sounds
-        self.success = pygame.mixer.Sound('../audio/success.wav')
-        self.success.set_volume(0.2)
-        self.watering_sound = pygame.mixer.Sound('../audio/water.mp3')
-        self.watering_sound.set_volume(0.2)
-        self.hoe_sound = pygame.mixer.Sound('../audio/hoe.wav')
-        self.hoe_sound.set_volume(0.2)
-
     def get_target_pos(self):
         self.target_pos = self.rect.center + PLAYER_TOOL_OFFSET[self.dir]
 
@@ -82,14 +79,13 @@ class Player(pygame.sprite.Sprite):
 
     def use_tool(self):
         if self.tools[self.tool_index] == 'hoe':
-            self.hoe_sound.play()
+            audio.play('hoe')
             self.soil_layer.get_hit(self.target_pos)
         elif self.tools[self.tool_index] == 'axe':
-            for tree in self.tree_sprites.sprites():
-                if tree.rect.collidepoint(self.target_pos):
-                    tree.damage()
+            for tree in self.tree_sprites.collide_point(self.target_pos):
+                tree.damage()
         elif self.tools[self.tool_index] == 'water':
-            self.watering_sound.play()
+            audio.play('water')
             self.soil_layer.water(self.target_pos)
 
     def import_assets(self):
@@ -100,7 +96,7 @@ class Player(pygame.sprite.Sprite):
                            'up_water': [], 'down_water': [], 'left_water': [], 'right_water': [], }
         for animation in self.animations.keys():
             full_path = '../graphics/character/' + animation
-            self.animations[animation] = import_folder(full_path)
+            self.animations[animation] = assets.folder(full_path)
 
     def animate(self, dt):
         self.frame_index += 4 * dt
@@ -109,7 +105,7 @@ class Player(pygame.sprite.Sprite):
         self.image = self.animations[self.dir + self.status][int(self.frame_index)]
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = keyboard.get_pressed()
         if not self.timers['tool_use'].active and not self.sleep:
             # vertical movement
             if keys[pygame.K_UP]:
@@ -168,7 +164,7 @@ class Player(pygame.sprite.Sprite):
 
             # detecting key press and collison with the interaction group
             if keys[pygame.K_RETURN]:
-                collided_interaction_sprite = pygame.sprite.spritecollide(self, self.interaction_sprites, False)
+                collided_interaction_sprite = self.interaction_sprites.collide_rect(self.rect)
                 if collided_interaction_sprite:
                     if collided_interaction_sprite[0].name == 'Trader':
                         self.toggle_shop()
@@ -180,18 +176,28 @@ class Player(pygame.sprite.Sprite):
             # problem the player can harvest multiple items with a single blow
             # harvest
             if keys[pygame.K_h]:
-                collided_plant_sprite = pygame.sprite.spritecollide(self, self.soil_layer.plant_sprites, False)
+                collided_plant_sprite = self.soil_layer.plant_sprites.collide_rect(self.rect)
                 if collided_plant_sprite and collided_plant_sprite[0].fully_grown:
                     self.player_add(collided_plant_sprite[0].type)
                     Particle(collided_plant_sprite[0].rect.topleft, collided_plant_sprite[0].image, self.all_sprites,
                              LAYERS['main'])
-                    self.soil_layer.grid[collided_plant_sprite[0].pos.y // TILE_SIZE][
-                        collided_plant_sprite[0].pos.x // TILE_SIZE].remove('P')
-                    collided_plant_sprite[0].kill()
+                    self.soil_layer.remove_plant(collided_plant_sprite[0])
+
+    def collision(self, dir, previous):
+        # the tiles between the previous and the new hitbox are swept so a long step can not go through a wall
+        horizontal = dir == 'horizontal'
+        if self.collision_map.sweep(previous, self.hitbox, self.dir_vec.x if horizontal else self.dir_vec.y,
+                                    horizontal):
+            if horizontal:
+                self.rect.centerx = self.hitbox.centerx
+                self.pos.x = self.hitbox.centerx
+            else:
+                self.rect.centery = self.hitbox.centery
+                self.pos.y = self.hitbox.centery
 
-    def collision(self, dir):
-        for sprite in self.collision_sprites.sprites():
-            if hasattr(sprite, 'hitbox') and sprite.collidable:
+        # only the collision sprites in the cells around the hitbox are tested
+        for sprite in self.collision_sprites.query(self.hitbox):
+            if sprite.collidable:
                 if sprite.hitbox.colliderect(self.hitbox):
                     if dir == 'horizontal':
                         if self.dir_vec.x > 0:  # moving to right
@@ -212,15 +218,17 @@ class Player(pygame.sprite.Sprite):
         if self.dir_vec.magnitude() > 0:
             self.dir_vec = self.dir_vec.normalize()
         # horizontal movement
+        previous = self.hitbox.copy()
         self.pos.x += dt * self.speed * self.dir_vec.x
         self.hitbox.centerx = round(self.pos.x)
         self.rect.centerx = self.hitbox.centerx
-        self.collision('horizontal')
+        self.collision('horizontal', previous)
         # vertical movement
+        previous = self.hitbox.copy()
         self.pos.y += dt * self.speed * self.dir_vec.y
         self.hitbox.centery = round(self.pos.y)
         self.rect.centery = self.hitbox.centery
-        self.collision('vertical')
+        self.collision('vertical', previous)
 
     def get_status(self):
         # if player is not moving it should be idle
@@ -230,18 +238,13 @@ class Player(pygame.sprite.Sprite):
         elif self.dir_vec.magnitude() == 0:
             self.status = '_idle'
 
-    def update_timer(self):
-        for timer in self.timers.values():
-            timer.update()
-
     def player_add(self, item):
         self.item_inventory[item] += 1
-        self.success.play()
+        audio.play('success')
 
     def update(self, dt):
         self.input()
         self.move(dt)
         self.animate(dt)
         self.get_status()
-        self.update_timer()
         self.get_target_pos()
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import time
+
+import numpy as np
+import pygame
+
+from assets import assets
+from settings import *
+
+STAGES = [
+    'custom_draw',
+    'update',
+    'world',
+    'timers',
+    'sky',
+    'rain',
+    'water_all',
+    'menu',
+    'overlay',
+    'transition',
+    'display_update']
+
+
+# times the stages of every frame into fixed size ring buffers (nothing is measured while it is disabled)
+# F3 toggles it and shows a frame time graph with the worst stages, F4 saves the last seconds of samples
+class Profiler:
+    def __init__(self, size=PROFILER_SAMPLES):
+        self.display_surface = pygame.display.get_surface()
+        self.enabled = False
+        self.stage_index = {stage: index for index, stage in enumerate(STAGES)}
+
+        # one row per frame: the time of every stage and the whole frame (last column), in milliseconds
+        self.samples = np.zeros((size, len(STAGES) + 1))
+        self.timestamps = np.zeros(size)
+        self.head = 0
+        self.count = 0
+        self.current = np.zeros(len(STAGES))
+        self.frame_start = 0
+
+        self.font = assets.font('../font/LycheeSoda.ttf', 20)
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.head = self.count = 0
+
+    def time(self, stage, func, *args):
+        if not self.enabled:
+            return func(*args)
+        start = time.perf_counter()
+        result = func(*args)
+        self.current[self.stage_index[stage]] += (time.perf_counter() - start) * 1000
+        return result
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current[:] = 0
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.enabled:
+            now = time.perf_counter()
+            self.samples[self.head, :-1] = self.current
+            self.samples[self.head, -1] = (now - self.frame_start) * 1000
+            self.timestamps[self.head] = now
+            self.head = (self.head + 1) % len(self.samples)
+            self.count = min(self.count + 1, len(self.samples))
+
+    # samples in the order they were taken, optionally only the ones of the last seconds
+    def history(self, seconds=None):
+        order = (np.arange(self.count) + self.head - self.count) % len(self.samples)
+        samples, timestamps = self.samples[order], self.timestamps[order]
+        if seconds is not None and self.count:
+            recent = timestamps >= timestamps[-1] - seconds
+            samples, timestamps = samples[recent], timestamps[recent]
+        return samples, timestamps
+
+    # stages sorted by their mean time (worst first) with (mean, max) in milliseconds
+    def worst_stages(self, samples):
+        means, maxes = samples[:, :-1].mean(axis=0), samples[:, :-1].max(axis=0)
+        return [(STAGES[index], means[index], maxes[index]) for index in np.argsort(-means)]
+
+    def dump(self, seconds=PROFILER_DUMP_SECONDS, path='../profiles'):
+        samples, timestamps = self.history(seconds)
+        if not len(samples):
+            return None
+        os.makedirs(path, exist_ok=True)
+        name = os.path.join(path, time.strftime('profile_%Y%m%d_%H%M%S'))
+
+        with open(name + '.csv', 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['time'] + STAGES + ['frame'])
+            for timestamp, row in zip(timestamps - timestamps[0], samples):
+                writer.writerow([f'{timestamp:.4f}'] + [f'{value:.3f}' for value in row])
+
+        frames = samples[:, -1]
+        summary = {
+            'frames': len(samples),
+            'frame_ms': {'mean': frames.mean(), 'p50': np.percentile(frames, 50), 'p95': np.percentile(frames, 95),
+                         'p99': np.percentile(frames, 99), 'max': frames.max()},
+            'stages_ms': {stage: {'mean': mean, 'max': maximum} for stage, mean, maximum in self.worst_stages(samples)}}
+        with open(name + '.json', 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2, default=float)
+        return name
+
+    def display(self):
+        if not self.enabled or not self.count:
+            return
+        samples, _ = self.history()
+
+        # frame time graph of the last frames with lines at 60 and 30 fps
+        graph = pygame.Rect(SCREEN_WIDTH - 420, 10, 400, 120)
+        pygame.draw.rect(self.display_surface, 'black', graph)
+        scale = graph.height / 50
+        for limit, color in ((1000 / 60, 'darkgreen'), (1000 / 30, 'darkred')):
+            y = graph.bottom - limit * scale
+            pygame.draw.line(self.display_surface, color, (graph.left, y), (graph.right, y))
+        frames = samples[-graph.width:, -1]
+        if len(frames) > 1:
+            points = [(graph.left + index, graph.bottom - min(frame * scale, graph.height))
+                      for index, frame in enumerate(frames.tolist())]
+            pygame.draw.lines(self.display_surface, 'white', False, points)
+
+        # worst stages
+        lines = [f'frame {frames.mean():.2f} ms  max {frames.max():.2f} ms']
+        lines += [f'{stage}: {mean:.2f} ms  max {maximum:.2f} ms'
+                  for stage, mean, maximum in self.worst_stages(samples)[:5]]
+        for index, line in enumerate(lines):
+            text_surf = self.font.render(line, False, 'white', 'black')
+            self.display_surface.blit(text_surf, (graph.left, graph.bottom + 5 + index * text_surf.get_height()))
@@ -0,0 +1,173 @@
+from bisect import bisect_left, insort
+from itertools import count
+
+import pygame
+
+from settings import *
+from sprites import Tile
+
+
+# keeps the sprites (and tiles) of the camera bucketed by layer (z) and ordered by y so drawing does not need to sort
+# every frame
+# static sprites are inserted once in their sorted position, only the moving ones (player, moving drops) are sorted
+# again each frame and merged into the static order
+# static sprites are also split in a grid of chunks (by the chunk of their top left corner) so only the chunks around
+# the camera are visited when drawing
+class RenderQueue:
+    def __init__(self):
+        # entries are (centery, order, sprite); order keeps the insertion order for sprites with the same y
+        self.static = {z: {} for z in LAYERS.values()}
+        # sprites bigger than a chunk (e.g the ground) would leak out of their chunk so they are culled one by one
+        self.large = {z: [] for z in LAYERS.values()}
+        self.moving = {z: [] for z in LAYERS.values()}
+        self.z_order = sorted(LAYERS.values())
+        self.entries = {}
+        self.order = {}
+        self.counter = count()
+        self.tile_count = 0
+
+        # sprites whose layer, position or moving state changed (or were just added) and have to be placed again
+        # ( dict is used as an ordered set so sprites added together keep their order )
+        self.pending = {}
+
+    def add(self, sprite):
+        self.order[sprite] = next(self.counter)
+        self.pending[sprite] = None
+
+    def remove(self, sprite):
+        self.unplace(sprite)
+        self.pending.pop(sprite, None)
+        del self.order[sprite]
+
+    def refresh(self, sprite):
+        if sprite in self.order:
+            self.pending[sprite] = None
+
+    def moving_sprites(self):
+        return [sprite for sprites in self.moving.values() for sprite in sprites]
+
+    def add_layer(self, z):
+        if z not in self.static:
+            self.static[z] = {}
+            self.large[z] = []
+            self.moving[z] = []
+            self.z_order = sorted(self.static.keys())
+
+    def place(self, sprite):
+        # sprites are placed lazily because some of them (e.g the player) set their z after joining the group
+        z = sprite.z
+        self.add_layer(z)
+        rect = sprite.rect
+        if getattr(sprite, 'moving', False):
+            self.moving[z].append(sprite)
+            self.entries[sprite] = (z, None, None)
+            return
+
+        entry = (rect.centery, self.order[sprite], sprite)
+        chunk, bucket = self.bucket(z, rect)
+        insort(bucket, entry)
+        self.entries[sprite] = (z, chunk, entry)
+
+    # chunk of a static rect and the sorted list its entry goes in
+    def bucket(self, z, rect):
+        if rect.width > CHUNK_SIZE or rect.height > CHUNK_SIZE:
+            return None, self.large[z]
+        chunk = (rect.left // CHUNK_SIZE, rect.top // CHUNK_SIZE)
+        return chunk, self.static[z].setdefault(chunk, [])
+
+    def unplace(self, sprite):
+        if sprite not in self.entries:
+            return
+        z, chunk, entry = self.entries.pop(sprite)
+        if entry is None:
+            self.moving[z].remove(sprite)
+            return
+
+        if chunk is None:
+            bucket = self.large[z]
+        else:
+            bucket = self.static[z][chunk]
+        del bucket[bisect_left(bucket, entry)]
+        if chunk is not None and not bucket:
+            del self.static[z][chunk]
+
+    # tiles (see Tile) never move or change, so they are placed right away and only their entry is kept (no
+    # bookkeeping per tile), they are removed in batches (e.g all the tiles of a chunk of the world)
+    def add_tiles(self, tiles):
+        for tile in tiles:
+            self.add_layer(tile.z)
+            insort(self.bucket(tile.z, tile.rect)[1], (tile.rect.centery, next(self.counter), tile))
+        self.tile_count += len(tiles)
+
+    def remove_tiles(self, tiles):
+        buckets = {}
+        for tile in tiles:
+            chunk, bucket = self.bucket(tile.z, tile.rect)
+            buckets[(tile.z, chunk)] = bucket
+        removed = set(tiles)
+        for (z, chunk), bucket in buckets.items():
+            bucket[:] = [entry for entry in bucket if entry[2] not in removed]
+            if chunk is not None and not bucket:
+                del self.static[z][chunk]
+        self.tile_count -= len(tiles)
+
+    def flush(self):
+        for sprite in self.pending:
+            self.unplace(sprite)
+            self.place(sprite)
+        self.pending.clear()
+
+    def visible_chunks(self, view):
+        # sprites are stored in the chunk of their top left corner and are never bigger than a chunk, so the chunks
+        # one step above and to the left of the view can still overlap it
+        left = (view.left - CHUNK_SIZE) // CHUNK_SIZE
+        top = (view.top - CHUNK_SIZE) // CHUNK_SIZE
+        right = (view.right - 1) // CHUNK_SIZE
+        bottom = (view.bottom - 1) // CHUNK_SIZE
+        return [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+
+    def layers(self, view):
+        # yields the sprites of every layer that may overlap the view rect in drawing order
+        # (lower z first, lower y first inside a layer)
+        self.flush()
+        visible_chunks = self.visible_chunks(view)
+        for z in self.z_order:
+            chunks = self.static[z]
+            buckets = [chunks[chunk] for chunk in visible_chunks if chunk in chunks]
+            large = [entry for entry in self.large[z] if entry[2].rect.colliderect(view)]
+            if large:
+                buckets.append(large)
+            if self.moving[z]:
+                buckets.append(sorted((sprite.rect.centery, self.order[sprite], sprite) for sprite in self.moving[z]
+                                      if sprite.rect.colliderect(view)))
+
+            if not buckets:
+                yield z, []
+            elif len(buckets) == 1:
+                yield z, [entry[2] for entry in buckets[0]]
+            else:
+                # the buckets are already sorted runs, so sorting them together is a cheap merge
+                entries = [entry for bucket in buckets for entry in bucket]
+                entries.sort()
+                yield z, [entry[2] for entry in entries]
+
+
+# composites tiles that never change or move into one surface per chunk, so a whole chunk is drawn with a single blit
+# tiles are (pos, surf) pairs, they are blitted in the order the camera would draw them (by y, then in given order)
+# returns one Tile per chunk
+def bake_tiles(tiles, z):
+    chunks = {}
+    for index, (pos, surf) in enumerate(tiles):
+        rect = surf.get_rect(topleft=pos)
+        chunk = (rect.left // CHUNK_SIZE, rect.top // CHUNK_SIZE)
+        chunks.setdefault(chunk, []).append((rect.centery, index, rect, surf))
+
+    baked = []
+    for chunk_tiles in chunks.values():
+        chunk_tiles.sort(key=lambda tile: tile[:2])
+        bounds = chunk_tiles[0][2].unionall([tile[2] for tile in chunk_tiles])
+        chunk_surf = pygame.Surface(bounds.size, pygame.SRCALPHA).convert_alpha()
+        chunk_surf.blits([(surf, rect.move(-bounds.x, -bounds.y)) for _, _, rect, surf in chunk_tiles], False)
+        baked.append(Tile(bounds.topleft, chunk_surf, z))
+    return baked
+
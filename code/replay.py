@@ -0,0 +1,84 @@
+import numpy as np
+import pygame
+
+from save import decode, encode
+
+# a recording is REPLAY_MAGIC, the version (2 bytes) and the zlib compressed arrays of the session, like a save
+REPLAY_MAGIC = b'MDVR'
+REPLAY_VERSION = 1
+
+# the keys Player and Menu read, every frame keeps them as one bit each
+REPLAY_KEYS = [pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE, pygame.K_q, pygame.K_LCTRL,
+               pygame.K_e, pygame.K_RETURN, pygame.K_ESCAPE, pygame.K_h]
+KEY_BITS = {key: 1 << index for index, key in enumerate(REPLAY_KEYS)}
+
+
+# the pressed keys of a frame, indexable by pygame key constants like the result of pygame.key.get_pressed
+class KeyState:
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+def key_mask(pressed):
+    return sum(bit for key, bit in KEY_BITS.items() if pressed[key])
+
+
+# what has to be the same at the end of the recording and of its replay
+def final_state(level):
+    player = level.player
+    return {
+        'money': np.array(player.money),
+        'items': np.array(list(player.item_inventory.values())),
+        'seeds': np.array(list(player.seed_inventory.values())),
+        'grid': level.soil_layer.grid.copy()}
+
+
+# records a session of the game: the seed of every random generator, the save it started from, the keys and the time
+# of every frame (the game loop turns them into the same simulation steps again)
+# the keyboard is sampled once per frame and the game reads that sample (see keyboard.set_source), so what is recorded
+# is exactly what was used
+class Recorder:
+    def __init__(self, path, seed, start=b''):
+        self.path = path
+        self.seed = seed
+        # bytes of the save file the level was loaded from (empty for a new farm)
+        self.start = start
+        self.frame_times = []
+        self.masks = []
+        self.keys = KeyState()
+
+    def record(self, frame_time):
+        mask = key_mask(pygame.key.get_pressed())
+        self.keys = KeyState(mask)
+        self.frame_times.append(frame_time)
+        self.masks.append(mask)
+
+    def get_pressed(self):
+        return self.keys
+
+    def save(self, level):
+        session = {
+            'seed': np.array(self.seed, dtype=np.uint64),
+            'start': np.frombuffer(self.start, dtype=np.uint8),
+            'frame_times': np.array(self.frame_times, dtype=np.float64),
+            'keys': np.array(self.masks, dtype=np.uint16)}
+        session.update({f'final_{name}': value for name, value in final_state(level).items()})
+        with open(self.path, 'wb') as file:
+            file.write(encode(session, REPLAY_MAGIC, REPLAY_VERSION))
+
+
+def load_recording(path):
+    with open(path, 'rb') as file:
+        session = decode(file.read(), REPLAY_MAGIC, REPLAY_VERSION)
+    session['seed'] = int(session['seed'])
+    session['start'] = session['start'].tobytes()
+    return session
+
+
+# names of the parts of the final state that differ between the recording and the level that replayed it
+def mismatches(session, level):
+    return [name for name, value in final_state(level).items()
+            if not np.array_equal(session[f'final_{name}'], value)]
@@ -0,0 +1,128 @@
+import io
+import os
+import threading
+import zlib
+from zipfile import BadZipFile
+
+import numpy as np
+
+from settings import *
+
+# a save file is SAVE_MAGIC, the version (2 bytes) and the zlib compressed arrays of the state (npz)
+# bump the version when the state changes, saves of other versions are not loaded
+SAVE_MAGIC = b'MDVS'
+SAVE_VERSION = 1
+
+PLANT_RECORD = np.dtype([('row', np.uint16), ('col', np.uint16), ('type', np.uint8), ('age', np.float64)])
+TREE_RECORD = np.dtype([('health', np.int8), ('alive', np.bool_)])
+SEED_TYPES = list(GROW_SPEED)
+
+
+# copies of everything that has to be saved, taken on the main thread (it only copies arrays and a few lists)
+def snapshot(level):
+    soil_layer, crops, orchard, player = level.soil_layer, level.soil_layer.crops, level.orchard, level.player
+
+    slots = np.flatnonzero(crops.active[:crops.count])
+    plants = np.zeros(len(slots), dtype=PLANT_RECORD)
+    plants['row'] = crops.row[slots]
+    plants['col'] = crops.col[slots]
+    plants['type'] = crops.type[slots]
+    plants['age'] = crops.age[slots]
+
+    tree_records = np.zeros(orchard.tree_count, dtype=TREE_RECORD)
+    tree_records['health'] = orchard.health[:orchard.tree_count]
+    tree_records['alive'] = orchard.alive[:orchard.tree_count]
+
+    return {
+        'grid': soil_layer.grid.copy(),
+        'plants': plants,
+        'trees': tree_records,
+        'fruit': orchard.present[:orchard.count].copy(),
+        'money': np.array(player.money),
+        'items': np.array(list(player.item_inventory.values())),
+        'seeds': np.array(list(player.seed_inventory.values()))}
+
+
+# (other files made of arrays, like the recordings of replay.py, use the same layout with their own magic and version)
+def encode(state, magic=SAVE_MAGIC, version=SAVE_VERSION):
+    arrays = io.BytesIO()
+    np.savez(arrays, **state)
+    return magic + version.to_bytes(2, 'little') + zlib.compress(arrays.getvalue())
+
+
+def decode(data, magic=SAVE_MAGIC, version=SAVE_VERSION):
+    if data[:4] != magic or int.from_bytes(data[4:6], 'little') != version:
+        raise ValueError('not a file of this version')
+    with np.load(io.BytesIO(zlib.decompress(data[6:]))) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+# puts the saved state in a level that was just created (an empty farm whose chunks are not loaded yet)
+# only the grid and the arrays are filled, the sprites are built by the world when it loads the chunks
+def apply(level, state):
+    soil_layer, orchard, player = level.soil_layer, level.orchard, level.player
+    if state['grid'].shape != soil_layer.grid.shape or len(state['trees']) != orchard.tree_count or \
+            len(state['fruit']) != orchard.count:
+        raise ValueError('the save is from another map')
+    # (a damaged or edited save is rejected before anything is changed too)
+    plants = state['plants']
+    rows, cols = soil_layer.grid.shape
+    row, col, seed_type = plants['row'].astype(int), plants['col'].astype(int), plants['type'].astype(int)
+    if ((row < 0) | (row >= rows) | (col < 0) | (col >= cols) | (seed_type < 0) | (seed_type >= len(SEED_TYPES))).any():
+        raise ValueError('the save has plants outside of the map or of unknown types')
+
+    # soil
+    soil_layer.grid[:] = state['grid']
+
+    # plants (their ages are set together)
+    cells = zip(plants['row'].tolist(), plants['col'].tolist(), plants['type'].tolist())
+    slots = [soil_layer.add_plant(row, col, SEED_TYPES[seed_type]) for row, col, seed_type in cells]
+    soil_layer.crops.age[slots] = plants['age']
+
+    # trees
+    orchard.health[:orchard.tree_count] = state['trees']['health']
+    orchard.alive[:orchard.tree_count] = state['trees']['alive']
+    orchard.show_fruit(state['fruit'])
+
+    # player
+    player.money = int(state['money'])
+    player.item_inventory.update(zip(player.item_inventory, state['items'].tolist()))
+    player.seed_inventory.update(zip(player.seed_inventory, state['seeds'].tolist()))
+
+
+# saves are compressed and written by a worker thread so saving never holds a frame
+class SaveGame:
+    def __init__(self, path):
+        self.path = path
+        self.thread = None
+
+    def save(self, level):
+        state = snapshot(level)
+        self.wait()
+        self.thread = threading.Thread(target=self.write, args=(state,), daemon=True)
+        self.thread.start()
+
+    def write(self, state):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # the old save is only replaced once the new one is complete
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(encode(state))
+        os.replace(temp_path, self.path)
+
+    # blocks until the last save is on the disk
+    def wait(self):
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    # returns whether a save was loaded (a missing or unreadable save starts a new game)
+    def load(self, level):
+        try:
+            with open(self.path, 'rb') as file:
+                state = decode(file.read())
+            # (a save of another map is rejected before anything is changed)
+            apply(level, state)
+        except (OSError, ValueError, KeyError, BadZipFile, zlib.error):
+            return False
+        return True
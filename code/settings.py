@@ -5,6 +5,64 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TILE_SIZE = 64
 
+# the camera groups the sprites of the world in square chunks so only the ones around the screen are drawn
+CHUNK_SIZE = TILE_SIZE * 8
+# cell size of the spatial hash used for collision and interaction queries
+SPATIAL_CELL_SIZE = TILE_SIZE * 2
+
+# world streaming: the map is built in square chunks of STREAM_CHUNK_SIZE pixels around the player
+# chunks closer than STREAM_LOAD_DISTANCE to the screen are loaded, the ones further than STREAM_EVICT_DISTANCE are
+# dropped and the chunks the player walks towards (STREAM_LOOKAHEAD seconds ahead) are loaded in advance
+STREAM_CHUNK_SIZE = CHUNK_SIZE * 2
+STREAM_LOAD_DISTANCE = TILE_SIZE * 4
+STREAM_EVICT_DISTANCE = STREAM_CHUNK_SIZE
+STREAM_LOOKAHEAD = 1.5
+# converted ground pieces kept around (the loaded chunks use some of them)
+STREAM_GROUND_CACHE_SIZE = 12
+
+# speed of the game clock (1 -> real time), everything in the level (movement, timers, the day) runs on it
+TIME_SCALE = 1
+
+# game loop: the world is simulated in fixed steps of 1 / SIMULATION_RATE seconds and drawn at most RENDER_FPS times
+# a second (0 -> no cap), moving sprites are drawn between their last two steps
+FIXED_TIMESTEP = True
+SIMULATION_RATE = 60
+RENDER_FPS = 120
+VSYNC = False
+# longer frame gaps (e.g dragging the window) are not caught up, so slow frames can not pile up more and more steps
+MAX_FRAME_TIME = 0.25
+MAX_SIMULATION_STEPS = 8
+
+# folders of graphics/ whose images are packed in one atlas sheet per folder (see atlas.py)
+ATLAS_FAMILIES = ['character', 'fruit', 'overlay', 'rain', 'soil', 'soil_water', 'water']
+
+# the farm is saved here at the end of every day and loaded when the game starts
+SAVE_PATH = '../saves/farm.sav'
+
+# audio: the music is streamed from its file, the sound effects are decoded once and played on the channels reserved
+# for their category (a full category stops its oldest sound)
+MUSIC_PATH = '../audio/bg.mp3'
+MUSIC_VOLUME = 0.2
+SOUND_CHANNELS = {'tools': 3, 'farm': 2, 'ui': 1}
+# name: (path, volume, category, minimum milliseconds between two plays)
+SOUNDS = {
+    'hoe': ('../audio/hoe.wav', 0.2, 'tools', 120),
+    'water': ('../audio/water.mp3', 0.2, 'tools', 120),
+    'axe': ('../audio/axe.mp3', 1, 'tools', 0),
+    'plant': ('../audio/plant.wav', 0.2, 'farm', 60),
+    'success': ('../audio/success.wav', 0.2, 'ui', 0)
+}
+
+# threads that decode the images and sounds behind the loading screen (None -> one per core)
+LOADER_THREADS = None
+
+# white silhouettes of the particle effects kept for reuse (one per source surface)
+SILHOUETTE_CACHE_SIZE = 64
+
+# profiler: frames kept in its ring buffers and seconds of samples saved by a dump
+PROFILER_SAMPLES = 1800
+PROFILER_DUMP_SECONDS = 10
+
 # overlay positions
 OVERLAY_POSITIONS = {
     'tool': (40, SCREEN_HEIGHT - 15),
@@ -31,6 +89,15 @@ LAYERS = {
     'rain drops': 10
 }
 
+# steps per second of the precomputed sky colour curves
+SKY_CURVE_RESOLUTION = 4
+
+# rain particles spawned per second over the visible part of the map
+RAIN_SPAWN_RATE = {
+    'floor': 60,
+    'drops': 60
+}
+
 APPLE_POS = {
     'Small': [(18, 17), (30, 37), (12, 50), (30, 45), (20, 30), (30, 10)],
     'Large': [(30, 24), (60, 65), (50, 50), (16, 40), (45, 50), (42, 70)]
@@ -41,6 +108,9 @@ GROW_SPEED = {
     'tomato': 0.7
 }
 
+# chance of an apple growing on each apple position of a tree every day
+FRUIT_CHANCE = 2 / 11
+
 SALE_PRICES = {
     'wood': 4,
     'apple': 2,
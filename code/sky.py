@@ -1,94 +1,146 @@
-from random import randint, choice
-
-import pygame
+import numpy as np
 
+from assets import assets
 from settings import *
-from sprites import Generic
 from timer import Timer
-from util import import_folder
+
+
+# colour of the sky at every step (SKY_CURVE_RESOLUTION steps per second) while it moves from one colour to the other
+# at speed units per second, precomputed so the sky only has to look it up every frame
+def color_curve(start, end, speed):
+    start, end = np.array(start, dtype=float), np.array(end, dtype=float)
+    steps = int(np.ceil(np.abs(end - start).max() / speed * SKY_CURVE_RESOLUTION))
+    times = np.arange(steps + 1) / SKY_CURVE_RESOLUTION
+    curve = np.clip(start + np.sign(end - start) * speed * times[:, None], np.minimum(start, end),
+                    np.maximum(start, end))
+    return [tuple(color) for color in curve.astype(np.uint8).tolist()]
 
 
 class Sky:
-    def __init__(self, reset):
-        self.display_surf = pygame.display.get_surface()
-        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.start_color = [255, 255, 255]
-        self.end_color = [38, 101, 189]
+    def __init__(self, reset, tint):
+        self.tint = tint
+        self.day_color = (255, 255, 255)
+        self.night_color = (38, 101, 189)
         self.transition_sign = -1
         self.dayTimer = Timer(120000, self.reset_sky)
         self.reset = reset
         self.speed = 1
 
-    def display(self, dt):
-        for index, value in enumerate(self.end_color):
-            if (self.transition_sign == -1 and self.start_color[index] > value) or (
-                    self.transition_sign == 1 and self.start_color[index] < value):
-                self.start_color[index] += self.transition_sign * self.speed * dt
-        self.dayTimer.update()
-        # check if already night
-        if (self.transition_sign == -1 and not self.dayTimer.active and self.start_color[0] <= self.end_color[0] and
-            self.start_color[1] <= self.end_color[1] and self.start_color[
-                2] <= self.end_color[2]) or (
-                self.transition_sign == 1 and not self.dayTimer.active and self.start_color[0] >= self.end_color[0] and
-                self.start_color[1] >= self.end_color[1] and self.start_color[2] >= self.end_color[2]):
+        # sunset (-1) and sunrise (1), the sky holds the last colour of a curve while the day timer runs
+        self.curves = {-1: color_curve(self.day_color, self.night_color, self.speed),
+                       1: color_curve(self.night_color, self.day_color, self.speed)}
+        self.elapsed = 0
+        self.start_color = self.day_color
+
+    # looks up the colour of the current curve at the elapsed time, true once the curve is over
+    def look_up_color(self):
+        curve = self.curves[self.transition_sign]
+        step = min(int(self.elapsed * SKY_CURVE_RESOLUTION), len(curve) - 1)
+        self.start_color = curve[step]
+        return step == len(curve) - 1
+
+    def update(self, dt):
+        self.elapsed += dt
+
+        # check if already night (or day)
+        if self.look_up_color() and not self.dayTimer.active:
             self.dayTimer.activate()
 
-        self.full_surf.fill(self.start_color)
-        self.display_surf.blit(self.full_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+    def display(self):
+        self.tint.set('sky', self.start_color)
+        self.tint.apply()
 
     def reset_sky(self):
         if self.transition_sign == -1:
-            self.start_color = [38, 101, 189]
-            self.end_color = [255, 255, 255]
             self.transition_sign = 1
         else:
             self.reset()
-            self.start_color = [255, 255, 255]
-            self.end_color = [38, 101, 189]
             self.transition_sign = -1
+        self.elapsed = 0
 
+    # after sleeping the sky is as bright as at the start of the day
+    def wake_up(self):
+        if self.transition_sign == -1:
+            self.elapsed = 0
+        else:
+            self.elapsed = len(self.curves[1]) / SKY_CURVE_RESOLUTION
+        # the sky can be drawn before the next update, it must not keep the colour of the night
+        self.look_up_color()
 
-class Drop(Generic):
-    def __init__(self, surf, pos, moving, groups, z):
-        super().__init__(pos, surf, groups, z)
-        # general setup
-        self.duration = randint(400, 500)
-        self.start_time = pygame.time.get_ticks()
 
-        # moving
+# fixed size ring buffer of rain particles kept in numpy arrays, so raining costs the same every frame
+# particles are spawned at a fixed rate per second (independent of the frame rate) and the oldest slots are reused
+class RainParticles:
+    def __init__(self, frames, spawn_rate, moving, duration=(0.4, 0.5)):
+        self.frames = frames
         self.moving = moving
+        self.duration = duration
+        self.set_spawn_rate(spawn_rate)
+
+    # the pool is sized for the spawn rate, so changing it drops the current particles
+    def set_spawn_rate(self, spawn_rate):
+        self.spawn_rate = spawn_rate
+
+        # a slot is alive while its age is lower than its lifetime
+        self.capacity = int(spawn_rate * self.duration[1]) + 1
+        self.pos = np.zeros((self.capacity, 2))
+        self.velocity = np.zeros((self.capacity, 2))
+        self.age = np.zeros(self.capacity)
+        self.lifetime = np.zeros(self.capacity)
+        self.frame = np.zeros(self.capacity, dtype=int)
+        self.head = 0
+        self.to_spawn = 0
+
+    def spawn(self, count, area, rng):
+        slots = (self.head + np.arange(count)) % self.capacity
+        self.head = (self.head + count) % self.capacity
+
+        self.pos[slots, 0] = rng.integers(area.left, area.right, count, endpoint=True)
+        self.pos[slots, 1] = rng.integers(area.top, area.bottom, count, endpoint=True)
+        self.age[slots] = 0
+        self.lifetime[slots] = rng.uniform(*self.duration, count)
+        self.frame[slots] = rng.integers(0, len(self.frames), count)
         if self.moving:
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.dir_vec = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200, 250)
+            self.velocity[slots] = np.outer(rng.uniform(200, 250, count), (-2, 4))
 
-    def update(self, dt):
-        # movement
+    def update(self, dt, area, rng, spawning):
+        self.age += dt
         if self.moving:
-            self.pos += self.dir_vec * self.speed * dt
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
-        # timer
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time >= self.duration:
-            self.kill()
+            self.pos += self.velocity * dt
+
+        if spawning and area.width and area.height:
+            self.to_spawn += self.spawn_rate * dt
+            count = int(self.to_spawn)
+            self.to_spawn -= count
+            if count:
+                self.spawn(min(count, self.capacity), area, rng)
+
+    # drawn by the camera on top of the sprites of the particles layer
+    def draw(self, surface, offset):
+        alive = np.flatnonzero(self.age < self.lifetime)
+        if alive.size:
+            xs = (self.pos[alive, 0] - offset[0]).astype(int).tolist()
+            ys = (self.pos[alive, 1] - offset[1]).astype(int).tolist()
+            frames = self.frame[alive].tolist()
+            surface.blits([(self.frames[frame], (x, y)) for frame, x, y in zip(frames, xs, ys)], False)
 
 
 # TODO set a duration for the whole rain session
 class Rain:
-    def __init__(self, all_sprites):
+    def __init__(self, all_sprites, rng, map_rect):
         self.all_sprites = all_sprites
-        self.rain_drops = import_folder('../graphics/rain/drops/')
-        self.rain_floor = import_folder('../graphics/rain/floor/')
-        self.screen_w, self.screen_h = pygame.image.load('../graphics/world/ground.png').get_size()
-
-    def create_floor(self):
-        Drop(choice(self.rain_floor), (randint(0, self.screen_w), randint(0, self.screen_h)), False, self.all_sprites,
-             LAYERS['rain floor'])
-
-    def create_drops(self):
-        Drop(choice(self.rain_drops), (randint(0, self.screen_w), randint(0, self.screen_h)), False, self.all_sprites,
-             LAYERS['rain drops'])
-
-    def update(self):
-        self.create_floor()
-        self.create_drops()
+        self.rng = rng
+        self.map_rect = map_rect
+
+        # particles are only spawned around the camera and drawn by it in the rain layers
+        self.floor = RainParticles(assets.folder('../graphics/rain/floor/'), RAIN_SPAWN_RATE['floor'], False)
+        self.drops = RainParticles(assets.folder('../graphics/rain/drops/'), RAIN_SPAWN_RATE['drops'], False)
+        self.all_sprites.add_layer_draw(LAYERS['rain floor'], self.floor.draw)
+        self.all_sprites.add_layer_draw(LAYERS['rain drops'], self.drops.draw)
+
+    def update(self, dt, player, raining=True):
+        # the camera view is only moved when drawing, so the spawn area is the one it will show around the player
+        offset_x, offset_y = self.all_sprites.camera_offset(player, *player.rect.topleft)
+        area = self.map_rect.clip((int(offset_x), int(offset_y), SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.floor.update(dt, area, self.rng, raining)
+        self.drops.update(dt, area, self.rng, raining)
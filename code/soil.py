@@ -1,196 +1,257 @@
-from random import choice
-
+import numpy as np
 import pygame
-from pytmx.util_pygame import load_pygame
 
+from assets import assets
+from audio import audio
+from daytick import Crops
 from settings import *
+from spatial import SpatialGroup
 from sprites import Generic
-from util import import_folder_dict, import_folder
+
+# every cell of the soil grid is a byte of these flags
+FARMABLE = 1
+TILLED = 2
+WATERED = 4
+PLANTED = 8
+
+
+# name of the soil tile (graphics/soil) for a tilled cell, given which of its neighbours are tilled
+# (top, bottom, left, right and any of the diagonals)
+def soil_tile_type(t, b, l, r, x):
+    tile_type = ''
+
+    if t: tile_type += 't'
+    if b: tile_type += 'b'
+    if l: tile_type += 'l'
+    if r: tile_type += 'r'
+    if not all((t, b, l, r)) and any(
+            (
+                    all((t, b, l)), all((t, b, r)), all((b, l, r)),
+                    all((t, l, r)))) and x: tile_type += 'x'
+
+    if not any((t, b, l, r)):
+        tile_type = 'o'
+    return tile_type
 
 
 # TODO check if player collided with a fully grown plan and pressed H
 class Plant(Generic):
-    def __init__(self, pos_rect, groups, seed_type, check_watered):
+    def __init__(self, pos_rect, groups, seed_type, crops, slot):
         # seed needs to watered everyday for growth
-        # For now, we update the seed everyday
+        # the age of the plant is kept by the crops engine, which shows its next stage when it grows enough
 
         path = f'../graphics/fruit/{seed_type}/'
         self.type = seed_type
         self.pos = pos_rect
-        self.frames = import_folder(path)
+        self.frames = assets.folder(path)
         self.grow_speed = GROW_SPEED[seed_type]
         self.fully_grown = False
-        self.age = 0
-        self.check_watered = check_watered
-        super().__init__(pos_rect.center, self.frames[self.age], groups, LAYERS['ground plant'], True, False)
-
-    def grow(self):
-        # if not fully grown and watered
-        if not self.fully_grown and self.check_watered(self.pos):
-            # TODO need to call this function before reseting all the watering
-            self.age += self.grow_speed
-            self.image = self.frames[int(self.age)]
-            self.rect = self.image.get_rect(center=self.pos.center)
-            if self.age >= len(self.frames) - 1:
-                self.fully_grown = True
-                self.collidable = True
-                self.groups()
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.7, -self.rect.height * 0.4)
+        self.crops = crops
+        self.slot = slot
+        super().__init__(pos_rect.center, self.frames[0], groups, LAYERS['ground plant'], True, False)
+        crops.attach(slot, self)
+        # a plant that is loaded again shows the stage its crop reached
+        if int(self.age):
+            self.show_stage(int(self.age))
+
+    @property
+    def age(self):
+        return float(self.crops.age[self.slot])
+
+    def show_stage(self, stage):
+        self.image = self.frames[stage]
+        self.rect = self.image.get_rect(center=self.pos.center)
+        if stage >= len(self.frames) - 1:
+            self.fully_grown = True
+            self.collidable = True
+        if stage > 0:
+            self.z = LAYERS['main']
+            self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.7, -self.rect.height * 0.4)
+        self.refresh()
+
+    # harvesting: the crop is gone
+    def kill(self):
+        if self.alive():
+            self.crops.remove(self.slot)
+        super().kill()
+
+    # the sprite leaves the world but the crop keeps growing
+    def unload(self):
+        self.crops.detach(self.slot)
+        super().kill()
 
 
 class SoilLayer:
-    def __init__(self, all_sprites, collision_sprites):
+    def __init__(self, all_sprites, collision_sprites, tmx_data):
         # sprite groups
         self.all_sprites = all_sprites
         self.collision_sprites = collision_sprites
         self.soil_sprites = pygame.sprite.Group()
         self.water_sprites = pygame.sprite.Group()
-        self.plant_sprites = pygame.sprite.Group()
+        self.plant_sprites = SpatialGroup(collision_sprites.spatial_hash)
+        # soil tile sprite of every tilled cell, so a tile can be changed in place when its neighbours are tilled
+        self.soil_tiles = {}
+        self.water_tiles = {}
+        # age of the planted crops
+        self.crops = Crops()
 
         # graphics
-        self.soil_surf = pygame.image.load('../graphics/soil/o.png')
-        self.soil_surfs = import_folder_dict('../graphics/soil/')
-        self.water_surfs = import_folder('../graphics/soil_water/')
+        self.soil_surf = assets.image('../graphics/soil/o.png')
+        self.soil_surfs = assets.folder_dict('../graphics/soil/')
+        self.water_surfs = assets.folder('../graphics/soil_water/')
+        # the frames of every crop are loaded with the level so planting a seed never touches the disk
+        self.plant_frames = {seed_type: assets.folder(f'../graphics/fruit/{seed_type}/') for seed_type in GROW_SPEED}
 
-        self.create_soil_grid()
+        self.create_soil_grid(tmx_data)
         self.create_hit_rects()
 
-        self.plant_sound = pygame.mixer.Sound('../audio/plant.wav')
-        self.plant_sound.set_volume(0.2)
-
         # requirements
         # if the area is farmable
         # if the soil has been watered
         # if the soil has a plant already
 
-    def create_soil_grid(self):
-        ground = pygame.image.load('../graphics/world/ground.png')
-        h_tiles, v_tiles = ground.get_width() // TILE_SIZE, ground.get_height() // TILE_SIZE
-
-        self.grid = [[[] for col in range(h_tiles)] for row in range(v_tiles)]
-        for x, y, _ in load_pygame('../data/map.tmx').get_layer_by_name('Farmable').tiles():
-            self.grid[y][x].append('F')
+    def create_soil_grid(self, tmx_data):
+        # one byte of flags per tile (grid[row][col]) so whole grid updates are numpy masks instead of python loops
+        self.grid = np.zeros((tmx_data.height, tmx_data.width), dtype=np.uint8)
+        self.grid[np.asarray(tmx_data.layer('Farmable')) > 0] |= FARMABLE
+        # the grid (and the crops) keep the whole farm, sprites only exist for the cells of the loaded chunks
+        self.loaded = np.zeros(self.grid.shape, dtype=bool)
 
     # For every farmable tile in the soil layer we make a rectangle that the player can hit
     def create_hit_rects(self):
-        self.hit_rects = []
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    soil_rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.hit_rects.append(soil_rect)
-
-    # Question shouldn't we return or break once we find the colliding point?
-    def get_hit(self, point):
-        for rect in self.hit_rects:
-            if rect.collidepoint(point):
-                # convert the rect to a point in grid
-                x = rect.x // TILE_SIZE
-                y = rect.y // TILE_SIZE
+        self.hit_rects = [pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                          for row, col in np.argwhere(self.grid & FARMABLE).tolist()]
 
-                if 'F' in self.grid[y][x]:
-                    # indicate soil patch
-                    self.grid[y][x].append('X')
-                    self.create_soil_tiles()
+    # grid cell (row, col) under a point of the world or None if the point is outside of the grid
+    def get_cell(self, point):
+        col = int(point[0]) // TILE_SIZE
+        row = int(point[1]) // TILE_SIZE
+        if 0 <= row < self.grid.shape[0] and 0 <= col < self.grid.shape[1]:
+            return row, col
+        return None
+
+    def get_hit(self, point):
+        cell = self.get_cell(point)
+        if cell and self.grid[cell] & FARMABLE and not self.grid[cell] & TILLED:
+            # indicate soil patch
+            self.grid[cell] |= TILLED
+            self.update_soil_tiles(*cell)
 
     # Question should it be possible to rewater the same spot?
-    # TODO instead of appending a string, check for boolean flags ? create a soil object with those flags
     def water(self, target_pos):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                if 'W' not in self.grid[y][x]:
-                    self.grid[y][x].append('W')
-                    water_surf = choice(self.water_surfs)
-                    Generic(soil_sprite.rect.topleft, water_surf, [self.all_sprites, self.water_sprites],
-                            LAYERS['soil water'])
+        cell = self.get_cell(target_pos)
+        if cell and self.grid[cell] & TILLED and not self.grid[cell] & WATERED:
+            self.grid[cell] |= WATERED
+            self.create_water_tile(*cell)
+
+    def create_water_tile(self, row, col):
+        if not self.loaded[row, col]:
+            return
+        # the image is picked by the cell (not at random) so a chunk that is loaded again (whenever its ground is
+        # decoded) looks the same and takes nothing from the random generator of the game
+        water_surf = self.water_surfs[hash((row, col)) % len(self.water_surfs)]
+        self.water_tiles[(row, col)] = Generic((col * TILE_SIZE, row * TILE_SIZE), water_surf,
+                                               [self.all_sprites, self.water_sprites], LAYERS['soil water'])
 
     def water_all(self):
-        # Question why not going through soil_sprites instead of going through the whole grid?
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                # reminder 'X' mean there is a soil patch
-                if 'X' in cell and 'W' not in cell:
-                    cell.append('W')
-                    water_surf = choice(self.water_surfs)
-                    Generic((index_col * TILE_SIZE, index_row * TILE_SIZE), water_surf,
-                            [self.all_sprites, self.water_sprites],
-                            LAYERS['soil water'])
+        # every soil patch that is not watered yet
+        dry = (self.grid & (TILLED | WATERED)) == TILLED
+        if dry.any():
+            self.grid[dry] |= WATERED
+            for row, col in np.argwhere(dry).tolist():
+                self.create_water_tile(row, col)
 
     def remove_water(self):
         # destroy all the water sprites
         for sprite in self.water_sprites.sprites():
             sprite.kill()
+        self.water_tiles.clear()
 
         # cleanup the grid
-        for row in self.grid:
-            for cell in row:
-                if 'W' in cell:
-                    cell.remove('W')
+        self.grid &= ~np.uint8(WATERED)
 
     def plant_seed(self, target_pos, seed_type):
         # check if the target position is a soil patch and it does not contain a seed already
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                if 'P' not in self.grid[y][x]:
-                    self.plant_sound.play()
-                    Plant(soil_sprite.rect, [self.all_sprites, self.collision_sprites, self.plant_sprites], seed_type,
-                          self.check_watered)
-                    # mark the soil as containing a plant
-                    self.grid[y][x].append('P')
-                    return True
+        cell = self.get_cell(target_pos)
+        if cell and self.grid[cell] & TILLED and not self.grid[cell] & PLANTED:
+            audio.play('plant')
+            self.add_plant(*cell, seed_type)
+            return True
         return False
 
+    def add_plant(self, row, col, seed_type):
+        slot = self.crops.add(row, col, seed_type, len(self.plant_frames[seed_type]))
+        self.create_plant(slot)
+        # mark the soil as containing a plant
+        self.grid[row, col] |= PLANTED
+        return slot
+
+    # sprite of a crop (if its cell is loaded)
+    def create_plant(self, slot):
+        row, col = int(self.crops.row[slot]), int(self.crops.col[slot])
+        if self.loaded[row, col]:
+            soil_rect = pygame.Rect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            Plant(soil_rect, [self.all_sprites, self.collision_sprites, self.plant_sprites],
+                  self.crops.seed_types[self.crops.type[slot]], self.crops, slot)
+
+    # harvesting a plant frees its soil patch
+    def remove_plant(self, plant):
+        self.grid[self.get_cell(plant.pos.topleft)] &= ~np.uint8(PLANTED)
+        plant.kill()
+
+    # only the plants of watered soil grow (this has to be called before the water is removed)
     def grow_plants(self):
-        for plant in self.plant_sprites:
-            plant.grow()
-
-    def check_watered(self, soil_patch_pos):
-        x = soil_patch_pos.x // TILE_SIZE
-        y = soil_patch_pos.y // TILE_SIZE
-        cell = self.grid[y][x]
-        is_watered = 'W' in cell
-        return is_watered
-
-    def create_soil_tiles(self):
-        # draw from scratch so we can connect patches that are adjacent
-        self.soil_sprites.empty()
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-                    # tile options
-                    # TODO fix the out of bound error?
-                    # Fix the tile naming for a more efficient tile finding
-                    t = 'X' in self.grid[index_row - 1][index_col]
-                    b = 'X' in self.grid[index_row + 1][index_col]
-                    r = 'X' in row[index_col + 1]
-                    l = 'X' in row[index_col - 1]
-                    x = 'X' in self.grid[index_row - 1][index_col - 1] or 'X' in self.grid[index_row - 1][
-                        index_col + 1] or 'X' in self.grid[index_row + 1][index_col - 1] or 'X' in \
-                        self.grid[index_row + 1][index_col + 1]
-
-                    tile_type = ''
-
-                    if t: tile_type += 't'
-                    if b: tile_type += 'b'
-                    if l: tile_type += 'l'
-                    if r: tile_type += 'r'
-                    if not all((t, b, l, r)) and any(
-                            (
-                                    all((t, b, l)), all((t, b, r)), all((b, l, r)),
-                                    all((t, l, r)))) and x: tile_type += 'x'
-
-                    if not any((t, b, l, r)):
-                        tile_type = 'o'
-
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    Generic((x, y), self.soil_surfs[tile_type], [self.all_sprites, self.soil_sprites],
-                            LAYERS['soil'])
+        self.crops.grow((self.grid & WATERED).astype(bool))
+
+    def is_tilled(self, row, col):
+        # cells outside of the grid are never tilled
+        return 0 <= row < self.grid.shape[0] and 0 <= col < self.grid.shape[1] and bool(self.grid[row, col] & TILLED)
+
+    # tilling a cell can only change the tiles of the cell itself and of its 8 neighbours
+    def update_soil_tiles(self, row, col):
+        for neighbour_row in range(row - 1, row + 2):
+            for neighbour_col in range(col - 1, col + 2):
+                if self.is_tilled(neighbour_row, neighbour_col):
+                    self.update_soil_tile(neighbour_row, neighbour_col)
+
+    def update_soil_tile(self, row, col):
+        if not self.loaded[row, col]:
+            return
+        # tile options: connect the patch to the adjacent ones
+        tile_type = soil_tile_type(
+            self.is_tilled(row - 1, col), self.is_tilled(row + 1, col),
+            self.is_tilled(row, col - 1), self.is_tilled(row, col + 1),
+            self.is_tilled(row - 1, col - 1) or self.is_tilled(row - 1, col + 1) or
+            self.is_tilled(row + 1, col - 1) or self.is_tilled(row + 1, col + 1))
+
+        # all the soil tiles have the same size, so the existing sprite only needs a new image
+        soil_sprite = self.soil_tiles.get((row, col))
+        if soil_sprite:
+            soil_sprite.image = self.soil_surfs[tile_type]
+        else:
+            self.soil_tiles[(row, col)] = Generic((col * TILE_SIZE, row * TILE_SIZE), self.soil_surfs[tile_type],
+                                                  [self.all_sprites, self.soil_sprites], LAYERS['soil'])
+
+    # builds the soil tiles, water and plants of a block of cells (top left inclusive, bottom right exclusive)
+    def load_area(self, top, left, bottom, right):
+        self.loaded[top:bottom, left:right] = True
+        area = self.grid[top:bottom, left:right]
+        for row, col in (np.argwhere(area & TILLED) + (top, left)).tolist():
+            self.update_soil_tile(row, col)
+        for row, col in (np.argwhere(area & WATERED) + (top, left)).tolist():
+            self.create_water_tile(row, col)
+        for slot in self.crops.slots_in(top, left, bottom, right).tolist():
+            self.create_plant(slot)
+
+    # removes the sprites of a block of cells, their state stays in the grid and the crops
+    def unload_area(self, top, left, bottom, right):
+        self.loaded[top:bottom, left:right] = False
+        # (only tilled cells can have a soil or a water tile)
+        for row, col in (np.argwhere(self.grid[top:bottom, left:right] & TILLED) + (top, left)).tolist():
+            for tiles in (self.soil_tiles, self.water_tiles):
+                sprite = tiles.pop((row, col), None)
+                if sprite:
+                    sprite.kill()
+        for slot in self.crops.slots_in(top, left, bottom, right).tolist():
+            if self.crops.plants[slot]:
+                self.crops.plants[slot].unload()
@@ -0,0 +1,107 @@
+from itertools import count
+
+import pygame
+
+from settings import *
+
+
+# uniform grid that remembers which cells every sprite covers, so collision and tool queries only look at the sprites
+# around a rect/point instead of going through a whole group
+# a sprite is indexed by its rect and its hitbox together, so both can be tested on the sprites returned by a query
+class SpatialHash:
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+        # the same hash is shared by several groups, a sprite stays indexed until the last of them removes it
+        self.references = {}
+        self.order = {}
+        self.counter = count()
+
+    def cells_of(self, rect):
+        left = rect.left // self.cell_size
+        top = rect.top // self.cell_size
+        # empty rects still cover the cell they are in
+        right = max(left, (rect.right - 1) // self.cell_size)
+        bottom = max(top, (rect.bottom - 1) // self.cell_size)
+        return [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+
+    def bounds(self, sprite):
+        hitbox = getattr(sprite, 'hitbox', None)
+        return sprite.rect.union(hitbox) if hitbox else sprite.rect
+
+    def insert(self, sprite):
+        if sprite in self.references:
+            self.references[sprite] += 1
+            return
+        self.references[sprite] = 1
+        self.order[sprite] = next(self.counter)
+        self.index(sprite)
+
+    def remove(self, sprite):
+        self.references[sprite] -= 1
+        if self.references[sprite] == 0:
+            self.unindex(sprite)
+            del self.references[sprite]
+            del self.order[sprite]
+
+    # has to be called when the rect or the hitbox of an indexed sprite changes (e.g a tree becoming a stump)
+    def update(self, sprite):
+        if sprite in self.references:
+            self.unindex(sprite)
+            self.index(sprite)
+
+    def index(self, sprite):
+        cells = self.cells_of(self.bounds(sprite))
+        for cell in cells:
+            self.cells.setdefault(cell, {})[sprite] = None
+        self.sprite_cells[sprite] = cells
+
+    def unindex(self, sprite):
+        for cell in self.sprite_cells.pop(sprite):
+            del self.cells[cell][sprite]
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    # sprites in the cells covered by the rect, in the order they were added (they still need a narrow test)
+    def query(self, rect):
+        found = {}
+        for cell in self.cells_of(rect):
+            if cell in self.cells:
+                found.update(self.cells[cell])
+        return sorted(found, key=self.order.__getitem__)
+
+    def query_point(self, point):
+        cell = (int(point[0]) // self.cell_size, int(point[1]) // self.cell_size)
+        return sorted(self.cells.get(cell, ()), key=self.order.__getitem__)
+
+
+# sprite group that keeps its sprites in a (shared) spatial hash
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, spatial_hash, *sprites):
+        self.spatial_hash = spatial_hash
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.spatial_hash.insert(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.spatial_hash.remove(sprite)
+
+    # called by sprites that changed their rect or hitbox (see Generic.refresh)
+    def refresh(self, sprite):
+        self.spatial_hash.update(sprite)
+
+    # broadphase: sprites of this group that are near the rect
+    def query(self, rect):
+        return [sprite for sprite in self.spatial_hash.query(rect) if sprite in self.spritedict]
+
+    # sprites of this group whose rect collides with the given rect/point (like pygame.sprite.spritecollide)
+    def collide_rect(self, rect):
+        return [sprite for sprite in self.query(rect) if sprite.rect.colliderect(rect)]
+
+    def collide_point(self, point):
+        return [sprite for sprite in self.spatial_hash.query_point(point)
+                if sprite in self.spritedict and sprite.rect.collidepoint(point)]
@@ -1,14 +1,17 @@
-from random import randint, choice
+from random import choice
 
 import pygame
 
+from assets import assets
+from audio import audio
 from settings import *
-from timer import Timer
+from timer import Timer, scheduler
+from ui import LRUCache
 
 
 class Generic(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups, z=LAYERS['main'], is_centered=False, collidable=True):
-        super().__init__(groups)
+        super().__init__()
         self.image = surf
         self.collidable = collidable
         if is_centered:
@@ -19,33 +22,35 @@ class Generic(pygame.sprite.Sprite):
         # we don't want to shrink too much in horizontal but in vertical we want a higher shrink otherwise the
         # character is unable to go behind object (e.g sunflower)
         self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
+        # groups are joined once the rect and the hitbox exist because spatial groups index them when adding
+        self.add(groups)
 
+    # has to be called when the layer or the rect of the sprite is changed outside of update so the groups that keep
+    # their sprites sorted (e.g the camera) can place it again
+    def refresh(self):
+        for group in self.groups():
+            if hasattr(group, 'refresh'):
+                group.refresh(self)
 
-class Interaction(Generic):
-    def __init__(self, pos, size, groups, name):
-        surf = pygame.Surface(size)
-        super().__init__(pos, surf, groups)
-        self.name = name
 
+# a tile of the map that never collides or moves (house, fence, water, ground): only what the camera needs to draw it
+# there are thousands of them, so it is not a sprite (no groups, no hitbox) and is given to the camera with add_tiles
+class Tile:
+    __slots__ = ('image', 'rect', 'z')
 
-# water is animated
-class Water(Generic):
-    def __init__(self, pos, frames, groups):
-        # animation setup
-        self.frames = frames
-        self.frame_index = 0
-
-        # sprite setup
-        super().__init__(pos, surf=self.frames[self.frame_index], groups=groups, z=LAYERS['water'])
+    def __init__(self, pos, surf, z=LAYERS['main']):
+        self.image = surf
+        self.rect = surf.get_rect(topleft=pos)
+        self.z = z
 
-    def animate(self, dt):
-        self.frame_index += 5 * dt
-        if self.frame_index >= len(self.frames):
-            self.frame_index = 0
-        self.image = self.frames[int(self.frame_index)]
 
-    def update(self, dt):
-        self.animate(dt)
+# an area the player can interact with, it is never drawn so it only has a rect
+class Interaction(pygame.sprite.Sprite):
+    def __init__(self, pos, size, groups, name):
+        super().__init__()
+        self.rect = pygame.Rect(pos, size)
+        self.name = name
+        self.add(groups)
 
 
 class WildFlower(Generic):
@@ -54,76 +59,90 @@ class WildFlower(Generic):
         self.hitbox = self.rect.copy().inflate(-20, -self.rect.height * 0.9)
 
 
+# white silhouette (made with a mask) of a surface particles flash with
+def silhouette(surf):
+    surf = pygame.mask.from_surface(surf).to_surface()
+    surf.set_colorkey((0, 0, 0))
+    return surf
+
+
+# every source surface (apple, stump, crop frames) only gets one silhouette
+silhouettes = LRUCache(silhouette, SILHOUETTE_CACHE_SIZE)
+
+
 class Particle(Generic):
     def __init__(self, pos, surf, groups, z, duration=200):
-        super().__init__(pos, surf, groups, z)
-        self.start_time = pygame.time.get_ticks()
+        # white surface (shared by the particles of the same surface)
+        super().__init__(pos, silhouettes.get(surf), groups, z)
         self.duration = duration
-        # white surface (using masks)
-        mask_surf = pygame.mask.from_surface(self.image)
-        new_surf = mask_surf.to_surface()
-        new_surf.set_colorkey((0, 0, 0))
-        self.image = new_surf
-
-    def update(self, dt):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time > self.duration:
-            self.kill()
+        scheduler.schedule(duration, self.kill)
 
 
 # TODO playr_add is basically a call back. if the collision is detected by each item independenly they can call the callback function when needed
 class Tree(Generic):
-    def __init__(self, pos, surf, groups, name, all_sprites, player_add):
+    def __init__(self, pos, surf, groups, name, all_sprites, player_add, orchard, index=None):
         super().__init__(pos, surf, groups)
         self.all_sprites = all_sprites
         self.player_add = player_add
-        # tree attributes
-        self.health = 5
-        self.alive = True
+        # tree attributes (health and alive are kept by the orchard, so they outlive the sprite)
+        self.orchard = orchard
+        self.index = orchard.add_tree(name, self.rect) if index is None else index
         stump_path = f'../graphics/stumps/{"small" if name == "Small" else "large"}.png'
-        self.stump_surf = pygame.image.load(stump_path).convert_alpha()
+        self.stump_surf = assets.image(stump_path)
         self.invul_timer = Timer(200)
+        if not self.alive:
+            self.show_stump()
 
-        # apples
-        self.apple_surf = pygame.image.load('../graphics/fruit/apple.png').convert_alpha()
-        self.apple_pos = APPLE_POS[name]
+        # apples (grown by the orchard every day)
+        self.apple_surf = assets.image('../graphics/fruit/apple.png')
         self.apple_sprites = pygame.sprite.Group()
-        self.create_fruit()
+        orchard.attach(self)
 
         self.player_add = player_add
 
-        # sounds
-        self.axe_sound = pygame.mixer.Sound('../audio/axe.mp3')
+    @property
+    def health(self):
+        return int(self.orchard.health[self.index])
+
+    @health.setter
+    def health(self, health):
+        self.orchard.health[self.index] = health
+
+    @property
+    def alive(self):
+        return bool(self.orchard.alive[self.index])
 
     # TODO fix the problem when multiple trees are being hit at the same time
     def damage(self):
         self.health -= 1
 
         # play the axe sound
-        self.axe_sound.play()
+        audio.play('axe')
 
         # remove apple when the tree is hit
         if len(self.apple_sprites.sprites()) > 0:
             random_apple = choice(self.apple_sprites.sprites())
             Particle(random_apple.rect.topleft, random_apple.image, self.all_sprites, LAYERS['fruit'])
-            random_apple.kill()
+            self.orchard.pick(random_apple)
             self.player_add('apple')
 
     def check_health(self):
         if self.health <= 0:
-            self.alive = False
-            self.image = self.stump_surf
-            self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
-            self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+            self.orchard.fell(self.index)
+            self.show_stump()
             Particle(self.rect.topleft, self.image, self.all_sprites, LAYERS['fruit'], 300)
             self.player_add('wood')
 
-    def create_fruit(self):
-        for pos in self.apple_pos:
-            if randint(0, 10) < 2:
-                x = pos[0] + self.rect.left
-                y = pos[1] + self.rect.top
-                Generic((x, y), self.apple_surf, [self.apple_sprites, self.all_sprites], LAYERS['fruit'])
+    def show_stump(self):
+        self.image = self.stump_surf
+        self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
+        self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+        self.refresh()
+
+    # the sprite leaves the world but the orchard keeps the state of the tree
+    def unload(self):
+        self.orchard.detach(self)
+        self.kill()
 
     def update(self, dt):
         if self.alive:
@@ -1,24 +1,74 @@
-import pygame
+from heapq import heappop, heappush
+from itertools import count
+
+
+# callbacks that run once the clock of the game reaches their deadline, kept in a heap ordered by deadline so every
+# step only looks at the ones that are due (instead of every timer polling the time)
+# the clock is moved forward by the level every simulation step, it can be sped up or slowed down (scale) and paused
+class Scheduler:
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.paused = False
+        self.clear()
+
+    # a new clock (e.g for a new level), nothing that was scheduled on the old one runs
+    def clear(self):
+        # milliseconds of game time
+        self.time = 0
+        self.heap = []
+        self.counter = count()
+
+    # returns the entry of the callback, to cancel it
+    def schedule(self, delay, func):
+        # the counter keeps the order of callbacks with the same deadline
+        entry = [self.time + delay, next(self.counter), func]
+        heappush(self.heap, entry)
+        return entry
+
+    # the entry stays in the heap but does nothing when it is due
+    def cancel(self, entry):
+        entry[2] = None
+
+    # moves the clock dt seconds (scaled) forward and runs what is due, returns the game time that passed
+    def advance(self, dt):
+        if self.paused:
+            return 0
+        dt *= self.scale
+        self.time += dt * 1000
+        heap = self.heap
+        while heap and heap[0][0] <= self.time:
+            func = heappop(heap)[2]
+            if func:
+                func()
+        return dt
+
+
+# game time (paused while the shop is open) and time of the ui (never paused)
+scheduler = Scheduler()
+ui_scheduler = Scheduler()
 
 
 class Timer:
-    def __init__(self, duration, func=None):
+    def __init__(self, duration, func=None, clock=scheduler):
         self.duration = duration
         self.func = func
-        self.start_time = 0
+        self.clock = clock
+        self.entry = None
         self.active = False
 
     def activate(self):
+        if self.entry:
+            self.clock.cancel(self.entry)
         self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.entry = self.clock.schedule(self.duration, self.expire)
 
     def deactivate(self):
+        if self.entry:
+            self.clock.cancel(self.entry)
         self.active = False
-        self.start_time = 0
-
-    def update(self):
-        current_time = pygame.time.get_ticks()
-        if self.active and current_time - self.start_time >= self.duration:
-            self.deactivate()
-            if self.func:
-                self.func()
+        self.entry = None
+
+    def expire(self):
+        self.deactivate()
+        if self.func:
+            self.func()
@@ -0,0 +1,41 @@
+import pygame
+
+from settings import *
+
+WHITE = (255, 255, 255)
+
+
+# post process stage that darkens the screen with the colours of the sky and of the sleep transition
+# the colours of every source are multiplied together and applied with a single multiply blit, which is skipped
+# when the result is white (a multiply by white changes nothing)
+class Tint:
+    def __init__(self):
+        self.display_surface = pygame.display.get_surface()
+        self.colors = {}
+
+        # the tint surface is only filled again when the (integer) colour changes
+        self.surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.surf_color = None
+
+    def set(self, source, color):
+        self.colors[source] = color
+
+    def remove(self, source):
+        self.colors.pop(source, None)
+
+    def color(self):
+        red, green, blue = WHITE
+        for source_red, source_green, source_blue in self.colors.values():
+            red = red * int(source_red) // 255
+            green = green * int(source_green) // 255
+            blue = blue * int(source_blue) // 255
+        return red, green, blue
+
+    def apply(self):
+        color = self.color()
+        if color == WHITE:
+            return
+        if color != self.surf_color:
+            self.surf.fill(color)
+            self.surf_color = color
+        self.display_surface.blit(self.surf, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+# values made by build(key) the first time their key is asked for, the least recently used ones are dropped once
+# there are more than size of them
+class LRUCache:
+    def __init__(self, build, size):
+        self.build = build
+        self.size = size
+        self.values = OrderedDict()
+
+    def get(self, key):
+        if key in self.values:
+            self.values.move_to_end(key)
+            return self.values[key]
+
+        value = self.build(key)
+        self.values[key] = value
+        if len(self.values) > self.size:
+            self.values.popitem(last=False)
+        return value
+
+
+# rendered texts of a font
+class TextCache(LRUCache):
+    def __init__(self, font, size=128):
+        super().__init__(lambda key: font.render(key[0], False, key[1]), size)
+
+    def render(self, text, color):
+        return self.get((text, color))
+
+
+# a piece of ui that is composited once into its own surface and only built again when its key changes
+# (the key is whatever state the piece shows, e.g money and inventories for the shop)
+class CachedSurface:
+    def __init__(self, build):
+        # build() returns the composited surface and the rect it covers on the screen
+        self.build = build
+        self.key = None
+        self.surf = None
+        self.rect = None
+        self.builds = 0
+
+    def update(self, key):
+        if self.surf is None or key != self.key:
+            self.surf, self.rect = self.build()
+            self.key = key
+            self.builds += 1
+
+    def draw(self, surface, key):
+        self.update(key)
+        surface.blit(self.surf, self.rect)
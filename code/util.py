@@ -1,6 +1,6 @@
 from os import walk
 
-import pygame.image
+from atlas import load_image
 
 
 def import_folder(path):
@@ -9,7 +9,7 @@ def import_folder(path):
     for _, _, img_files in walk(path):
         for img in img_files:
             image_path = path + "/" + img
-            img_surf = pygame.image.load(image_path).convert_alpha()
+            img_surf = load_image(image_path)
             surface_list.append(img_surf)
 
     return surface_list
@@ -20,7 +20,7 @@ def import_folder_dict(path):
     for _, _, img_files in walk(path):
         for img in img_files:
             image_path = path + "/" + img
-            img_surf = pygame.image.load(image_path).convert_alpha()
+            img_surf = load_image(image_path)
             surface_dict[img.split('.')[0]] = img_surf
 
     return surface_dict
@@ -0,0 +1,205 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from assets import assets
+from cache import read_header, write_header
+from render import bake_tiles
+from settings import *
+from sprites import Tile, Tree, WildFlower
+
+
+# the ground image cut in one image per stream chunk, so a chunk only loads its own piece of the ground
+# (the whole image is only loaded the first time, when the cache is made)
+def ground_cache(path, chunk_size):
+    cache = os.path.join('../data', os.path.splitext(os.path.basename(path))[0] + '.cache')
+    stat = os.stat(path)
+    key = [chunk_size, stat.st_mtime_ns, stat.st_size]
+    if read_header(cache, key) is not None:
+        return cache
+
+    os.makedirs(cache, exist_ok=True)
+    ground = pygame.image.load(path)
+    width, height = ground.get_size()
+    for y in range(0, height, chunk_size):
+        for x in range(0, width, chunk_size):
+            piece = ground.subsurface(pygame.Rect(x, y, chunk_size, chunk_size).clip(ground.get_rect()))
+            pygame.image.save(piece, os.path.join(cache, f'{x // chunk_size}_{y // chunk_size}.png'))
+    write_header(cache, key)
+    return cache
+
+
+# decodes the ground pieces of the chunks the player walks towards, so a frame only has to convert them
+ground_decoder = ThreadPoolExecutor(LOADER_THREADS or os.cpu_count())
+
+
+# builds the sprites of the map only for the chunks around the player and drops the far ones
+# what can change in a chunk (soil, crops, trees and their apples) is kept by the soil layer and the orchard, so a
+# chunk that is loaded again looks like it was left
+class World:
+    def __init__(self, tmx_data, all_sprites, collision_sprites, tree_sprites, soil_layer, orchard, player):
+        self.tmx_data = tmx_data
+        self.all_sprites = all_sprites
+        self.collision_sprites = collision_sprites
+        self.tree_sprites = tree_sprites
+        self.soil_layer = soil_layer
+        self.orchard = orchard
+        self.player = player
+
+        self.chunk_tiles = STREAM_CHUNK_SIZE // TILE_SIZE
+        self.columns = -(-tmx_data.width // self.chunk_tiles)
+        self.rows = -(-tmx_data.height // self.chunk_tiles)
+        self.ground = ground_cache('../graphics/world/ground.png', STREAM_CHUNK_SIZE)
+        # pieces of the ground being decoded by the threads, and the last converted ones (so walking back and forth
+        # does not decode them again)
+        self.ground_jobs = {}
+        self.ground_surfs = OrderedDict()
+        # every water tile shows the same frame of the animation
+        self.water_frames = assets.folder('../graphics/water')
+        self.water_index = 0
+        self.water = {}
+
+        # objects by the chunk of their position, trees get their index in the orchard here so their state exists
+        # before their sprites
+        self.objects = {}
+        for obj in tmx_data.get_objects('Decoration'):
+            self.objects.setdefault(self.chunk_of((obj.x, obj.y)), []).append((obj, None))
+        for obj in tmx_data.get_objects('Trees'):
+            index = orchard.add_tree(obj.name, pygame.Rect((obj.x, obj.y), obj.image.get_size()))
+            self.objects.setdefault(self.chunk_of((obj.x, obj.y)), []).append((obj, index))
+
+        # sprites and tiles of every loaded chunk
+        self.loaded = {}
+
+    def chunk_of(self, pos):
+        return int(pos[0]) // STREAM_CHUNK_SIZE, int(pos[1]) // STREAM_CHUNK_SIZE
+
+    # chunks of the map that overlap the rect
+    def chunks_in(self, rect):
+        left, top = max(rect.left // STREAM_CHUNK_SIZE, 0), max(rect.top // STREAM_CHUNK_SIZE, 0)
+        right = min((rect.right - 1) // STREAM_CHUNK_SIZE, self.columns - 1)
+        bottom = min((rect.bottom - 1) // STREAM_CHUNK_SIZE, self.rows - 1)
+        return [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+
+    # the block of tiles of a chunk (top, left, bottom, right)
+    def area(self, chunk):
+        left, top = chunk[0] * self.chunk_tiles, chunk[1] * self.chunk_tiles
+        bottom = min(top + self.chunk_tiles, self.tmx_data.height)
+        right = min(left + self.chunk_tiles, self.tmx_data.width)
+        return top, left, bottom, right
+
+    def load(self, chunk):
+        tmx_data, area = self.tmx_data, self.area(chunk)
+        sprites = []
+
+        # the bottom of the house is never sorted against the player, so its tiles are baked in chunk surfaces
+        house_bottom = [((x * TILE_SIZE, y * TILE_SIZE), surf) for layer in ['HouseFloor', 'HouseFurnitureBottom']
+                        for x, y, surf in tmx_data.tiles(layer, area)]
+        tiles = bake_tiles(house_bottom, LAYERS['house bottom'])
+
+        # house and fence (it blocks the player through the collision map, like the tiles of the collision layer)
+        for layer in ['HouseWalls', 'HouseFurnitureTop', 'Fence']:
+            for x, y, surf in tmx_data.tiles(layer, area):
+                tiles.append(Tile((x * TILE_SIZE, y * TILE_SIZE), surf))
+
+        # water ( is animated so we need to import all the frames)
+        water_surf = self.water_frames[int(self.water_index)]
+        self.water[chunk] = [Tile((x * TILE_SIZE, y * TILE_SIZE), water_surf, LAYERS['water'])
+                             for x, y, surf in tmx_data.tiles('Water', area)]
+        tiles += self.water[chunk]
+
+        # wildflowers and trees
+        for obj, index in self.objects.get(chunk, ()):
+            if index is None:
+                sprites.append(WildFlower((obj.x, obj.y), obj.image, [self.all_sprites, self.collision_sprites]))
+            else:
+                sprites.append(Tree((obj.x, obj.y), obj.image,
+                                    [self.all_sprites, self.collision_sprites, self.tree_sprites], obj.name,
+                                    self.all_sprites, self.player.player_add, self.orchard, index))
+
+        # the piece of the ground under the chunk
+        ground = self.ground_surf(chunk)
+        tiles.append(Tile((chunk[0] * STREAM_CHUNK_SIZE, chunk[1] * STREAM_CHUNK_SIZE), ground, LAYERS['ground']))
+
+        self.all_sprites.add_tiles(tiles)
+        self.soil_layer.load_area(*area)
+        self.loaded[chunk] = (sprites, tiles)
+
+    # starts decoding the piece of the ground of a chunk on a thread
+    def request_ground(self, chunk):
+        if chunk not in self.ground_surfs and chunk not in self.ground_jobs:
+            path = os.path.join(self.ground, f'{chunk[0]}_{chunk[1]}.png')
+            self.ground_jobs[chunk] = ground_decoder.submit(pygame.image.load, path)
+
+    def ground_ready(self, chunk):
+        return chunk in self.ground_surfs or (chunk in self.ground_jobs and self.ground_jobs[chunk].done())
+
+    # the converted piece of the ground of a chunk (waits for its decoding when the chunk is needed right away)
+    def ground_surf(self, chunk):
+        if chunk in self.ground_surfs:
+            self.ground_surfs.move_to_end(chunk)
+            return self.ground_surfs[chunk]
+
+        self.request_ground(chunk)
+        surf = self.ground_jobs.pop(chunk).result().convert_alpha()
+        self.ground_surfs[chunk] = surf
+        if len(self.ground_surfs) > STREAM_GROUND_CACHE_SIZE:
+            self.ground_surfs.popitem(last=False)
+        return surf
+
+    def unload(self, chunk):
+        sprites, tiles = self.loaded.pop(chunk)
+        for sprite in sprites:
+            if isinstance(sprite, Tree):
+                sprite.unload()
+            else:
+                sprite.kill()
+        self.all_sprites.remove_tiles(tiles)
+        del self.water[chunk]
+        self.soil_layer.unload_area(*self.area(chunk))
+
+    def animate(self, dt):
+        frame = int(self.water_index)
+        self.water_index += 5 * dt
+        if self.water_index >= len(self.water_frames):
+            self.water_index = 0
+        if int(self.water_index) != frame:
+            water_surf = self.water_frames[int(self.water_index)]
+            for tiles in self.water.values():
+                for tile in tiles:
+                    tile.image = water_surf
+
+    def update(self):
+        # what the camera will show around the player
+        player = self.player
+        view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        view.center = player.rect.center
+        margin = STREAM_LOAD_DISTANCE * 2
+
+        # the chunks on (or close to) the screen are needed now
+        for chunk in self.chunks_in(view.inflate(margin, margin)):
+            if chunk not in self.loaded:
+                self.load(chunk)
+
+        # the ground of the chunks the player is walking towards is decoded in the background, one of them is loaded
+        # once its ground is ready
+        ahead = []
+        if player.dir_vec.magnitude() > 0:
+            offset = player.dir_vec.normalize() * player.speed * STREAM_LOOKAHEAD
+            ahead = self.chunks_in(view.move(round(offset.x), round(offset.y)).inflate(margin, margin))
+            missing = [chunk for chunk in ahead if chunk not in self.loaded]
+            for chunk in missing:
+                self.request_ground(chunk)
+            for chunk in missing:
+                if self.ground_ready(chunk):
+                    self.load(chunk)
+                    break
+
+        # far chunks are dropped (and the decoded ground nobody is waiting for anymore)
+        keep = set(self.chunks_in(view.inflate(STREAM_EVICT_DISTANCE * 2, STREAM_EVICT_DISTANCE * 2))) | set(ahead)
+        for chunk in [chunk for chunk in self.loaded if chunk not in keep]:
+            self.unload(chunk)
+        for chunk in [chunk for chunk in self.ground_jobs if chunk not in keep and self.ground_jobs[chunk].done()]:
+            del self.ground_jobs[chunk]